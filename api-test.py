@@ -16,134 +16,54 @@ Usage:
 4. Explore the API functionality
 """
 
+import concurrent.futures
 import json
+import os
 import sys
-import time
-from urllib.parse import urljoin
 
-import requests
+from lib.api import KinoPubAPI
 
+# Dump full error payloads only when KINOPUB_DEBUG is set
+DEBUG = bool(os.environ.get("KINOPUB_DEBUG"))
 
-class KinoPubAPI:
+
+class ConsoleKinoPubAPI(KinoPubAPI):
     """
-    Kino.pub API Client with Device Flow Authentication
+    Kino.pub API client reporting device activation progress on the console
 
-    Uses public device credentials for OAuth 2.0 Device Flow authentication.
+    Requests, retries and token handling come from lib.api; outside Kodi the
+    client keeps tokens in memory only.
     """
 
-    def __init__(self):
-        self.base_url = "https://api.service-kp.com"
-
-        # Public device credentials (found in client implementations)
-        self.client_id = "xbmc"
-        self.client_secret = "cgg3gtifu46urtfp2zp1nqtba0k2ezxh"
-
-        self.access_token = None
-        self.refresh_token = None
-        self.device_code = None
-        self.user_code = None
-        self.verification_uri = None
-        self.expires_in = None
-        self.interval = 5
-
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "Content-Type": "application/x-www-form-urlencoded",
-                "User-Agent": "KinoPub-Python-Test/1.0",
-            }
-        )
+    # Even with Kodistubs installed, never touch the Kodi profile or monitor
+    IN_KODI = False
 
-    def _make_request(
-        self,
-        method: str,
-        endpoint: str,
-        params: dict = None,
-        data: dict = None,
-        require_auth: bool = True,
-        use_json: bool = False,
-    ) -> dict:
-        """Make HTTP request to API with error handling"""
-        url = urljoin(self.base_url, endpoint)
-
-        # Prepare headers
-        headers = {}
-        if require_auth and self.access_token:
-            headers["Authorization"] = f"Bearer {self.access_token}"
-
-        if use_json:
-            headers["Content-Type"] = "application/json"
-
-        try:
-            if method.upper() == "GET":
-                response = self.session.get(url, params=params, headers=headers)
-            elif method.upper() == "POST":
-                if use_json:
-                    response = self.session.post(
-                        url, params=params, json=data, headers=headers
-                    )
-                else:
-                    response = self.session.post(url, data=data, headers=headers)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-
-            response.raise_for_status()
-            return response.json()
-
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Request failed: {e}")
-            if hasattr(e, "response") and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    print(f"Error response: {json.dumps(error_data, indent=2)}")
-                except Exception:
-                    print(f"Error response text: {e.response.text}")
-            return {}
+    DEVICE_INFO = {
+        "title": "Python Test Client",
+        "hardware": "PC",
+        "software": "Python/Test",
+    }
 
-    def start_device_auth(self) -> bool:
-        """
-        Start OAuth 2.0 Device Flow authentication
+    def __init__(self) -> None:
+        super().__init__()
+        self.session.headers["User-Agent"] = "KinoPub-Python-Test/1.0"
 
-        Returns:
-            bool: True if device code was obtained successfully
-        """
+    def start_device_auth(self) -> bool:
+        """Start device authentication and print activation instructions"""
         print("🔐 Starting device authentication...")
 
-        data = {
-            "grant_type": "device_code",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-        }
-
-        response = self._make_request(
-            "POST", "/oauth2/device", data=data, require_auth=False
-        )
-
-        if response and "code" in response:
-            self.device_code = response["code"]
-            self.user_code = response["user_code"]
-            self.verification_uri = response["verification_uri"]
-            self.expires_in = response.get("expires_in", 8600)
-            self.interval = response.get("interval", 5)
-
-            print("✅ Device code obtained!")
-            print(f"📱 Please visit: {self.verification_uri}")
-            print(f"🔑 Enter this code: {self.user_code}")
-            print(f"⏱️  Code expires in {self.expires_in} seconds")
-            print(f"⏰ Will check every {self.interval} seconds for activation...")
-
-            return True
-        else:
-            print("❌ Failed to get device code")
+        if not super().start_device_auth():
             return False
 
-    def wait_for_activation(self) -> bool:
-        """
-        Poll for device activation
+        print("✅ Device code obtained!")
+        print(f"📱 Please visit: {self.verification_uri}")
+        print(f"🔑 Enter this code: {self.user_code}")
+        print(f"⏱️  Code expires in {self.expires_in} seconds")
+        print(f"⏰ Will check every {self.interval} seconds for activation...")
+        return True
 
-        Returns:
-            bool: True if successfully authenticated
-        """
+    def wait_for_activation(self) -> bool:
+        """Wait for the user to enter the code, then poll for activation"""
         if not self.device_code:
             print("❌ No device code available. Call start_device_auth() first.")
             return False
@@ -154,200 +74,30 @@ class KinoPubAPI:
         )
         input("🔄 Press Enter after entering the code on kino.pub/device...")
 
-        start_time = time.time()
-        attempt = 0
-
-        while time.time() - start_time < self.expires_in:
-            attempt += 1
-            data = {
-                "grant_type": "device_token",
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-                "code": self.device_code,
-            }
-
-            print(f"🔍 Checking activation status (attempt {attempt})...")
-
-            # Make request without using the error-handling wrapper for auth polling
-            try:
-                url = f"{self.base_url}/oauth2/device"
-                response = self.session.post(url, data=data)
-
-                if response.status_code == 200:
-                    # Success - we got the tokens
-                    token_data = response.json()
-                    self.access_token = token_data["access_token"]
-                    self.refresh_token = token_data.get("refresh_token")
-
-                    print("✅ Authentication successful!")
-                    print(
-                        f"🎯 Access token obtained (expires in {token_data.get('expires_in', 'unknown')} seconds)"
-                    )
-
-                    # Notify device
-                    self.notify_device()
-
-                    return True
-
-                elif response.status_code == 400:
-                    # Check if it's still pending
-                    try:
-                        error_data = response.json()
-                        if error_data.get("error") == "authorization_pending":
-                            print("⏳ Still waiting for activation... (this is normal)")
-                            print(
-                                f"⏰ Time remaining: {int(self.expires_in - (time.time() - start_time))} seconds"
-                            )
-                            time.sleep(self.interval)
-                            continue
-                        else:
-                            print(f"❌ Authentication error: {error_data}")
-                            return False
-                    except Exception:
-                        print(f"❌ Unexpected error response: {response.text}")
-                        return False
-
-                else:
-                    print(f"❌ HTTP error {response.status_code}: {response.text}")
-                    return False
-
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Network error: {e}")
-                return False
-
-        print("⏰ Device code expired")
-        return False
-
-    def notify_device(self):
-        """Notify kino.pub that device is connected"""
-        if not self.access_token:
-            return
-
-        data = {
-            "title": "Python Test Client",
-            "hardware": "PC",
-            "software": "Python/Test",
-        }
-
-        params = {"access_token": self.access_token}
-        response = self._make_request(
-            "POST", "/v1/device/notify", params=params, data=data, use_json=True
-        )
-
-        if response:
-            print("📱 Device notification sent")
-
-    def refresh_access_token(self) -> bool:
-        """
-        Refresh the access token using refresh token
-
-        Returns:
-            bool: True if token was refreshed successfully
-        """
-        if not self.refresh_token:
-            print("❌ No refresh token available")
+        if not super().wait_for_activation():
             return False
 
-        data = {
-            "grant_type": "refresh_token",
-            "client_id": self.client_id,
-            "client_secret": self.client_secret,
-            "refresh_token": self.refresh_token,
-        }
+        print("✅ Authentication successful!")
+        return True
 
-        response = self._make_request(
-            "POST", "/oauth2/token", data=data, require_auth=False
-        )
+    def _on_request_error(self, endpoint: str, error: Exception) -> None:
+        """Print why a request failed, with the error payload in debug mode"""
+        print(f"❌ Request to {endpoint} failed: {error}")
+        response = getattr(error, "response", None)
+        if DEBUG and response is not None:
+            try:
+                error_data = response.json()
+                print(f"Error response: {json.dumps(error_data, indent=2)}")
+            except Exception:
+                print(f"Error response text: {response.text}")
 
-        if response and "access_token" in response:
-            self.access_token = response["access_token"]
-            self.refresh_token = response.get("refresh_token")
-            print("✅ Token refreshed successfully!")
-            return True
-        else:
-            print("❌ Failed to refresh token")
+    def notify_device(self) -> bool:
+        """Notify kino.pub that device is connected"""
+        if not super().notify_device():
             return False
 
-    def get_items(
-        self, page: int = 1, perpage: int = 10, type_filter: str = None
-    ) -> dict:
-        """
-        Get video content items
-
-        Args:
-            page: Page number
-            perpage: Items per page
-            type_filter: Content type filter (movie, serial, etc.)
-
-        Returns:
-            Dict: API response with items
-        """
-        params = {"access_token": self.access_token, "page": page, "perpage": perpage}
-
-        if type_filter:
-            params["type"] = type_filter
-
-        return self._make_request("GET", "/v1/items", params=params)
-
-    def get_item_details(self, item_id: str) -> dict:
-        """
-        Get detailed information about specific item
-
-        Args:
-            item_id: Item ID
-
-        Returns:
-            Dict: Item details
-        """
-        params = {"access_token": self.access_token}
-        return self._make_request("GET", f"/v1/items/{item_id}", params=params)
-
-    def search_content(self, query: str, page: int = 1, perpage: int = 10) -> dict:
-        """
-        Search for content
-
-        Args:
-            query: Search query
-            page: Page number
-            perpage: Items per page
-
-        Returns:
-            Dict: Search results
-        """
-        params = {
-            "access_token": self.access_token,
-            "q": query,
-            "page": page,
-            "perpage": perpage,
-        }
-
-        return self._make_request("GET", "/v1/items/search", params=params)
-
-    def get_tv_channels(self) -> dict:
-        """
-        Get available TV channels
-
-        Returns:
-            Dict: TV channels list
-        """
-        params = {"access_token": self.access_token}
-        return self._make_request("GET", "/v1/tv/index", params=params)
-
-    def get_genres(self, genre_type: str = None) -> dict:
-        """
-        Get available genres
-
-        Args:
-            genre_type: Genre type filter (movie, music, docu)
-
-        Returns:
-            Dict: Genres list
-        """
-        params = {"access_token": self.access_token}
-        if genre_type:
-            params["type"] = genre_type
-
-        return self._make_request("GET", "/v1/genres", params=params)
+        print("📱 Device notification sent")
+        return True
 
 
 def print_items(items_data: dict):
@@ -383,7 +133,7 @@ def main():
     print("=" * 40)
 
     # Initialize API client
-    api = KinoPubAPI()
+    api = ConsoleKinoPubAPI()
 
     # Step 1: Start device authentication
     if not api.start_device_auth():
@@ -398,29 +148,40 @@ def main():
     print("\n🎉 Authentication successful! Testing API endpoints...")
     print("=" * 60)
 
+    search_query = input("Enter search term (or press Enter for 'Marvel'): ").strip()
+    if not search_query:
+        search_query = "Marvel"
+
+    # The listing calls are independent, so run them concurrently over the
+    # session's connection pool and print the results in order afterwards
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        f_movies = executor.submit(api.get_items, 1, 5, "movie")
+        f_series = executor.submit(api.get_items, 1, 5, "serial")
+        f_search = executor.submit(api.search_content, search_query, 1, 3)
+        f_genres = executor.submit(api.get_genres, "movie")
+        f_tv_channels = executor.submit(api.get_tv_channels)
+
+        movies = f_movies.result()
+        series = f_series.result()
+        search_results = f_search.result()
+        genres = f_genres.result()
+        tv_channels = f_tv_channels.result()
+
     # Test 1: Get recent movies
     print("\n1️⃣ Testing: Get recent movies")
-    movies = api.get_items(page=1, perpage=5, type_filter="movie")
     print_items(movies)
 
     # Test 2: Get recent TV series
     print("\n2️⃣ Testing: Get recent TV series")
-    series = api.get_items(page=1, perpage=5, type_filter="serial")
     print_items(series)
 
     # Test 3: Search functionality
     print("\n3️⃣ Testing: Search functionality")
-    search_query = input("Enter search term (or press Enter for 'Marvel'): ").strip()
-    if not search_query:
-        search_query = "Marvel"
-
-    search_results = api.search_content(search_query, perpage=3)
     print(f"🔍 Search results for '{search_query}':")
     print_items(search_results)
 
     # Test 4: Get genres
     print("\n4️⃣ Testing: Get movie genres")
-    genres = api.get_genres("movie")
     if genres and "genres" in genres:
         print("🎭 Available movie genres:")
         for genre in genres["genres"][:10]:  # Show first 10
@@ -428,7 +189,6 @@ def main():
 
     # Test 5: TV Channels
     print("\n5️⃣ Testing: Get TV channels")
-    tv_channels = api.get_tv_channels()
     if tv_channels and "channels" in tv_channels:
         print(f"📺 Found {len(tv_channels['channels'])} TV channels:")
         for channel in tv_channels["channels"][:5]:  # Show first 5
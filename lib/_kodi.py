@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Kino.pub Kodi Helpers
+=====================
+
+Kodi helpers shared by the Kino.pub addon modules.
+"""
+
+from typing import Any
+
+
+class LocalizedStrings(dict[int, str]):
+    """Localized strings of an addon by ID, fetched from Kodi on first use"""
+
+    def __init__(self, addon: Any) -> None:
+        super().__init__()
+        self.addon = addon
+
+    def __missing__(self, string_id: int) -> str:
+        value: str = self.addon.getLocalizedString(string_id)
+        self[string_id] = value
+        return value
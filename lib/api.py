@@ -8,12 +8,72 @@ API client for Kino.pub streaming service with OAuth 2.0 Device Flow authenticat
 
 import json
 import os
+import tempfile
 import time
-from urllib.parse import urljoin
+from collections.abc import Iterator
+from typing import Any
+from urllib.parse import urlencode
 
 import requests  # type: ignore[import-untyped]
-import xbmcaddon  # type: ignore[import-untyped]
-import xbmcvfs  # type: ignore[import-untyped]
+from requests.adapters import HTTPAdapter  # type: ignore[import-untyped]
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+
+try:
+    import xbmc  # type: ignore[import-untyped]
+    import xbmcaddon  # type: ignore[import-untyped]
+    import xbmcvfs  # type: ignore[import-untyped]
+except ImportError:
+    # Optional so api-test.py imports without Kodi or Kodistubs; clients
+    # outside Kodi opt out of these modules with IN_KODI = False
+    xbmc = xbmcaddon = xbmcvfs = None
+
+# Every content coding urllib3 can decode here; includes br when a Brotli
+# package is installed, which compresses JSON listings better than gzip
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+# Upper bound for the device activation poll interval, in seconds
+MAX_POLL_INTERVAL = 30
+
+# Lifetime of cached responses for rarely changing endpoints, in seconds
+GENRES_CACHE_TTL = 3600
+TV_CHANNELS_CACHE_TTL = 300
+
+# Seconds a prefetched listing page stays valid for the next plugin call
+ITEMS_PREFETCH_TTL = 300
+
+# (connect, read) timeouts in seconds so a stalled network can't hang the UI
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+# Prefetches only give the next page a head start, so they fail fast
+PREFETCH_READ_TIMEOUT = 3
+
+# HTTP methods accepted by _make_request
+SUPPORTED_METHODS = frozenset({"GET", "POST"})
+
+# Per-request header overrides on top of the session headers, keyed by
+# (require_auth, use_json); None drops the session's Authorization header
+HEADER_OVERRIDES: dict[tuple[bool, bool], dict[str, Any]] = {
+    (True, False): {},
+    (True, True): {"Content-Type": "application/json"},
+    (False, False): {"Authorization": None},
+    (False, True): {"Authorization": None, "Content-Type": "application/json"},
+}
+
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_SKEW = 60
+
+
+class _SleepMonitor:
+    """Stand-in for xbmc.Monitor when running outside Kodi"""
+
+    def abortRequested(self) -> bool:
+        return False
+
+    def waitForAbort(self, timeout: float) -> bool:
+        time.sleep(timeout)
+        return False
 
 
 class KinoPubAPI:
@@ -23,7 +83,18 @@ class KinoPubAPI:
     Uses public device credentials for OAuth 2.0 Device Flow authentication.
     """
 
-    def __init__(self) -> None:
+    # Keep tokens in the addon profile and wait through Kodi's monitor;
+    # clients running outside Kodi set this to False
+    IN_KODI = True
+
+    # Device description reported to kino.pub after activation
+    DEVICE_INFO = {
+        "title": "Kodi Addon",
+        "hardware": "Kodi",
+        "software": "Kino.pub Addon/1.0",
+    }
+
+    def __init__(self, addon: Any = None) -> None:
         self.base_url = "https://api.service-kp.com"
 
         # Public device credentials (found in client implementations)
@@ -32,33 +103,81 @@ class KinoPubAPI:
 
         self.access_token = None
         self.refresh_token = None
+        self.access_token_expires_at: float | None = None
         self.device_code = None
         self.user_code = None
         self.verification_uri = None
         self.expires_in = None
+        self.device_code_expires_at: float | None = None
         self.interval = 5
 
         self.session = requests.Session()
         self.session.headers.update(
             {
+                "Accept-Encoding": ACCEPT_ENCODING,
                 "Content-Type": "application/x-www-form-urlencoded",
                 "User-Agent": "KinoPub-Kodi-Addon/1.0",
             }
         )
 
-        # Load cached tokens
-        self._load_tokens()
+        # Keep the keep-alive connection to the API host pooled and retry
+        # transient gateway errors instead of failing the whole listing
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=10,
+            max_retries=Retry(
+                total=3, backoff_factor=0.3, status_forcelist=(429, 502, 503, 504)
+            ),
+        )
+        self.session.mount("https://", adapter)
+
+        # Responses of rarely changing endpoints: key -> (fetched_at, response)
+        self._cache: dict[str, tuple[float, dict]] = {}
+
+        # Session without retries for prefetches, created on first use
+        self._prefetch_session: requests.Session | None = None
 
-    def _get_cache_path(self) -> str:
+        # Addon profile directory never changes during a session
+        self._cache_path: str | None = None
+        if self.IN_KODI:
+            # Reuse the caller's Addon handle instead of constructing another one
+            if addon is None:
+                addon = xbmcaddon.Addon()
+
+            profile_path = addon.getAddonInfo("profile")
+            self._cache_path = str(xbmcvfs.translatePath(profile_path))
+
+            # Load cached tokens and responses
+            self._load_tokens(self._cache_path)
+            self._load_cache(self._cache_path)
+
+    def _get_cache_path(self) -> str | None:
         """Get cache file path for storing tokens"""
-        addon = xbmcaddon.Addon()
-        profile_path = addon.getAddonInfo("profile")
-        return str(xbmcvfs.translatePath(profile_path))
+        return self._cache_path
 
-    def _load_tokens(self) -> None:
-        """Load cached access and refresh tokens"""
+    def _write_json(self, filename: str, data: dict) -> None:
+        """Atomically write data to a JSON file in the cache directory"""
+        cache_path = self._get_cache_path()
+        if cache_path is None:
+            return
+
+        os.makedirs(cache_path, exist_ok=True)
+        target = os.path.join(cache_path, filename)
+
+        # Write a temporary file first so a crash never leaves a truncated
+        # file; unique per write, as concurrent plugin calls share the profile
+        fd, tmp = tempfile.mkstemp(dir=cache_path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _load_tokens(self, cache_path: str) -> None:
+        """Load cached access and refresh tokens and pending device code"""
         try:
-            cache_path = self._get_cache_path()
             tokens_file = os.path.join(cache_path, "tokens.json")
 
             if xbmcvfs.exists(tokens_file):
@@ -66,28 +185,109 @@ class KinoPubAPI:
                     tokens = json.load(f)
                     self.access_token = tokens.get("access_token")
                     self.refresh_token = tokens.get("refresh_token")
+                    self.access_token_expires_at = tokens.get("access_token_expires_at")
+                    self.device_code = tokens.get("device_code")
+                    self.user_code = tokens.get("user_code")
+                    self.verification_uri = tokens.get("verification_uri")
+                    self.device_code_expires_at = tokens.get("device_code_expires_at")
+                    self.interval = tokens.get("interval", self.interval)
+                self._set_auth_header()
         except Exception:
             # Log error but continue without cached tokens
             pass
 
     def _save_tokens(self) -> None:
-        """Save access and refresh tokens to cache"""
+        """Save access and refresh tokens and pending device code to cache"""
         try:
-            cache_path = self._get_cache_path()
-            os.makedirs(cache_path, exist_ok=True)
-            tokens_file = os.path.join(cache_path, "tokens.json")
-
             tokens = {
                 "access_token": self.access_token,
                 "refresh_token": self.refresh_token,
+                "access_token_expires_at": self.access_token_expires_at,
+                "device_code": self.device_code,
+                "user_code": self.user_code,
+                "verification_uri": self.verification_uri,
+                "device_code_expires_at": self.device_code_expires_at,
+                "interval": self.interval,
             }
 
-            with open(tokens_file, "w") as f:
-                json.dump(tokens, f)
+            self._write_json("tokens.json", tokens)
+        except Exception:
+            # Log error but continue
+            pass
+
+    def _load_cache(self, cache_path: str) -> None:
+        """Load cached API responses"""
+        try:
+            cache_file = os.path.join(cache_path, "cache.json")
+
+            if xbmcvfs.exists(cache_file):
+                with open(cache_file) as f:
+                    self._cache = {
+                        key: (fetched_at, response)
+                        for key, (fetched_at, response) in json.load(f).items()
+                    }
+                self._prune_cache()
+        except Exception:
+            # Log error but continue with an empty cache
+            pass
+
+    def _save_cache(self) -> None:
+        """Save cached API responses"""
+        try:
+            self._prune_cache()
+            self._write_json("cache.json", self._cache)
         except Exception:
             # Log error but continue
             pass
 
+    def _prune_cache(self) -> None:
+        """Drop prefetched listing pages that were never opened in time"""
+        expired_before = time.time() - ITEMS_PREFETCH_TTL
+        self._cache = {
+            key: entry
+            for key, entry in self._cache.items()
+            if not key.startswith("/v1/items?") or entry[0] >= expired_before
+        }
+
+    def _get_prefetch_session(self) -> requests.Session:
+        """Get the session for prefetches, sharing headers but not retries"""
+        if self._prefetch_session is None:
+            session = requests.Session()
+            # Same dict, so token updates reach prefetches as well
+            session.headers = self.session.headers
+            session.mount("https://", HTTPAdapter(max_retries=0))
+            self._prefetch_session = session
+        return self._prefetch_session
+
+    @staticmethod
+    def _cache_key(endpoint: str, params: dict | None) -> str:
+        """Build the response cache key for a GET request"""
+        if not params:
+            return endpoint
+        return endpoint + "?" + urlencode(sorted(params.items()))
+
+    def _cached_get(self, endpoint: str, params: dict | None, ttl: int) -> dict:
+        """Make GET request, reusing a cached response younger than ttl"""
+        key = self._cache_key(endpoint, params)
+
+        cached = self._cache.get(key)
+        if cached and time.time() - cached[0] < ttl:
+            return cached[1]
+
+        response = self._make_request("GET", endpoint, params=params)
+        if response:
+            self._cache[key] = (time.time(), response)
+            self._save_cache()
+
+        return response
+
+    def _set_auth_header(self) -> None:
+        """Attach the current access token to every session request"""
+        if self.access_token:
+            self.session.headers["Authorization"] = f"Bearer {self.access_token}"
+        else:
+            self.session.headers.pop("Authorization", None)
+
     def _make_request(
         self,
         method: str,
@@ -96,45 +296,96 @@ class KinoPubAPI:
         data: dict | None = None,
         require_auth: bool = True,
         use_json: bool = False,
+        retry_auth: bool = True,
+        prefetch: bool = False,
     ) -> dict:
-        """Make HTTP request to API with error handling"""
-        url = urljoin(self.base_url, endpoint)
-
-        # Prepare headers
-        headers = {}
-        if require_auth and self.access_token:
-            headers["Authorization"] = f"Bearer {self.access_token}"
+        """
+        Make HTTP request to API with error handling
 
-        if use_json:
-            headers["Content-Type"] = "application/json"
+        A prefetch request uses a short read timeout and is never retried.
+        """
+        method = method.upper()
+        if method not in SUPPORTED_METHODS:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        url = self.base_url + endpoint
+
+        # Refresh a token that is about to expire instead of waiting for a 401
+        if (
+            require_auth
+            and self.refresh_token
+            and self.access_token_expires_at is not None
+            and self.access_token_expires_at - time.time() < TOKEN_REFRESH_SKEW
+        ):
+            self.refresh_access_token()
+
+        headers = HEADER_OVERRIDES[require_auth, use_json]
+
+        if prefetch:
+            session = self._get_prefetch_session()
+            timeout = (CONNECT_TIMEOUT, PREFETCH_READ_TIMEOUT)
+        else:
+            session = self.session
+            timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
 
         try:
-            if method.upper() == "GET":
-                response = self.session.get(url, params=params, headers=headers)
-            elif method.upper() == "POST":
-                if use_json:
-                    response = self.session.post(
-                        url, params=params, json=data, headers=headers
-                    )
-                else:
-                    response = self.session.post(url, data=data, headers=headers)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+            response = session.request(
+                method,
+                url,
+                params=params,
+                data=None if use_json else data,
+                json=data if use_json else None,
+                headers=headers,
+                timeout=timeout,
+            )
+
+            # Token was rejected: refresh it once and repeat the request
+            if (
+                response.status_code == 401
+                and require_auth
+                and retry_auth
+                and self.refresh_access_token()
+            ):
+                return self._make_request(
+                    method,
+                    endpoint,
+                    params=params,
+                    data=data,
+                    require_auth=require_auth,
+                    use_json=use_json,
+                    retry_auth=False,
+                    prefetch=prefetch,
+                )
 
             response.raise_for_status()
-            return response.json() or {}
 
-        except requests.exceptions.RequestException:
-            # Log error and return empty dict
+            # Parse the raw bytes directly, skipping requests' charset detection
+            if not response.content:
+                return {}
+            return json.loads(response.content) or {}
+
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            self._on_request_error(endpoint, e)
             return {}
 
+    def _on_request_error(self, endpoint: str, error: Exception) -> None:
+        """Handle a failed request; callers still get an empty dict"""
+
     def start_device_auth(self) -> bool:
         """
         Start OAuth 2.0 Device Flow authentication
 
+        Reuses a cached device code while it is still valid, so restarting
+        the addon mid-activation keeps the code shown to the user.
+
         Returns:
             bool: True if device code was obtained successfully
         """
+        remaining = (self.device_code_expires_at or 0) - time.time()
+        if self.device_code and remaining > 0:
+            self.expires_in = int(remaining)
+            return True
+
         data = {
             "grant_type": "device_code",
             "client_id": self.client_id,
@@ -151,6 +402,9 @@ class KinoPubAPI:
             self.verification_uri = response["verification_uri"]
             self.expires_in = response.get("expires_in", 8600)
             self.interval = response.get("interval", 5)
+            self.device_code_expires_at = time.time() + response.get("expires_in", 8600)
+
+            self._save_tokens()
 
             return True
         else:
@@ -166,25 +420,45 @@ class KinoPubAPI:
         if not self.device_code:
             return False
 
-        start_time = time.time()
-
-        while time.time() - start_time < (self.expires_in or 0):
-            data = {
+        # The poll request never changes, so encode it once for the whole loop
+        url = f"{self.base_url}/oauth2/device"
+        body = urlencode(
+            {
                 "grant_type": "device_token",
                 "client_id": self.client_id,
                 "client_secret": self.client_secret,
                 "code": self.device_code,
             }
+        ).encode()
+
+        # Wait through Kodi so addon shutdown interrupts the poll immediately
+        monitor = xbmc.Monitor() if self.IN_KODI else _SleepMonitor()
+        start_time = time.time()
+
+        while time.time() - start_time < (self.expires_in or 0):
+            if monitor.abortRequested():
+                return False
 
             try:
-                url = f"{self.base_url}/oauth2/device"
-                response = self.session.post(url, data=data)
+                # Never wait on the network longer than the poll interval
+                response = self.session.post(
+                    url,
+                    data=body,
+                    timeout=(CONNECT_TIMEOUT, min(self.interval, READ_TIMEOUT)),
+                )
 
                 if response.status_code == 200:
                     # Success - we got the tokens
                     token_data = response.json()
                     self.access_token = token_data["access_token"]
+                    self._set_auth_header()
                     self.refresh_token = token_data.get("refresh_token")
+                    self.access_token_expires_at = time.time() + token_data.get(
+                        "expires_in", 3600
+                    )
+
+                    # Device code is consumed once activated
+                    self._clear_device_code()
 
                     # Save tokens
                     self._save_tokens()
@@ -197,37 +471,71 @@ class KinoPubAPI:
                 elif response.status_code == 400:
                     # Check if it's still pending
                     try:
-                        error_data = response.json()
-                        if error_data.get("error") == "authorization_pending":
-                            time.sleep(self.interval)
-                            continue
-                        else:
-                            return False
+                        error = response.json().get("error")
                     except Exception:
+                        break
+
+                    if error == "slow_down":
+                        # Server asks us to poll less often (RFC 8628)
+                        self.interval += 5
+                    elif error != "authorization_pending":
+                        break
+                    elif self.interval < MAX_POLL_INTERVAL:
+                        # Grow by at least a second so short intervals back off
+                        self.interval = min(
+                            max(self.interval + 1, int(self.interval * 1.25)),
+                            MAX_POLL_INTERVAL,
+                        )
+
+                    if monitor.waitForAbort(self.interval):
                         return False
+                    continue
                 else:
-                    return False
+                    break
 
-            except requests.exceptions.RequestException:
+            except requests.exceptions.RequestException as e:
+                # Keep the code, the network may be back on the next launch
+                self._on_request_error("/oauth2/device", e)
                 return False
+        else:
+            # Code expired while polling; start_device_auth() won't reuse it
+            return False
+
+        self._on_request_error(
+            "/oauth2/device",
+            requests.exceptions.HTTPError(
+                f"Device activation rejected with status {response.status_code}",
+                response=response,
+            ),
+        )
 
+        # Denied or rejected: the code can never be activated, so don't offer
+        # it again on the next launch
+        self._clear_device_code()
+        self._save_tokens()
         return False
 
-    def notify_device(self) -> None:
-        """Notify kino.pub that device is connected"""
-        if not self.access_token:
-            return
+    def _clear_device_code(self) -> None:
+        """Forget the pending device code"""
+        self.device_code = None
+        self.user_code = None
+        self.verification_uri = None
+        self.device_code_expires_at = None
 
-        data = {
-            "title": "Kodi Addon",
-            "hardware": "Kodi",
-            "software": "Kino.pub Addon/1.0",
-        }
+    def notify_device(self) -> bool:
+        """
+        Notify kino.pub that device is connected
+
+        Returns:
+            bool: True if the notification was accepted
+        """
+        if not self.access_token:
+            return False
 
-        params = {"access_token": self.access_token or ""}
-        self._make_request(
-            "POST", "/v1/device/notify", params=params, data=data, use_json=True
+        response = self._make_request(
+            "POST", "/v1/device/notify", data=self.DEVICE_INFO, use_json=True
         )
+        return bool(response)
 
     def refresh_access_token(self) -> bool:
         """
@@ -252,10 +560,17 @@ class KinoPubAPI:
 
         if response and "access_token" in response:
             self.access_token = response["access_token"]
+            self._set_auth_header()
             self.refresh_token = response.get("refresh_token")
+            self.access_token_expires_at = time.time() + response.get(
+                "expires_in", 3600
+            )
             self._save_tokens()
             return True
         else:
+            # Stop refreshing ahead of every request; a rejected token still
+            # gets one refresh attempt through the 401 retry
+            self.access_token_expires_at = None
             return False
 
     def is_authenticated(self) -> bool:
@@ -276,17 +591,77 @@ class KinoPubAPI:
         Returns:
             Dict: API response with items
         """
-        params = {
-            "access_token": self.access_token or "",
-            "page": page,
-            "perpage": perpage,
-        }
+        params: dict[str, int | str] = {"page": page, "perpage": perpage}
 
         if type_filter:
             params["type"] = type_filter
 
+        # A page prefetched by an earlier plugin call is served only once
+        prefetched = self._cache.pop(self._cache_key("/v1/items", params), None)
+        if prefetched:
+            self._save_cache()
+            if time.time() - prefetched[0] < ITEMS_PREFETCH_TTL:
+                return prefetched[1]
+
         return self._make_request("GET", "/v1/items", params=params)
 
+    def prefetch_items(
+        self, page: int = 1, perpage: int = 20, type_filter: str | None = None
+    ) -> None:
+        """
+        Fetch a page of video content items ahead of time
+
+        The response is kept in the response cache until get_items() asks
+        for the same page, so turning to the next page needs no request.
+
+        Args:
+            page: Page number
+            perpage: Items per page
+            type_filter: Content type filter (movie, serial, etc.)
+        """
+        params: dict[str, int | str] = {"page": page, "perpage": perpage}
+
+        if type_filter:
+            params["type"] = type_filter
+
+        response = self._make_request("GET", "/v1/items", params=params, prefetch=True)
+        if response:
+            key = self._cache_key("/v1/items", params)
+            self._cache[key] = (time.time(), response)
+            self._save_cache()
+
+    def iter_items(
+        self, type_filter: str | None = None, perpage: int = 20
+    ) -> Iterator[dict]:
+        """
+        Iterate over video content items page by page
+
+        Pages are requested lazily, so a consumer that stops early never
+        fetches the remaining pages.
+
+        Args:
+            type_filter: Content type filter (movie, serial, etc.)
+            perpage: Items per page
+
+        Yields:
+            Dict: Content item
+        """
+        page = 1
+        while True:
+            response = self.get_items(
+                page=page, perpage=perpage, type_filter=type_filter
+            )
+            items = response.get("items")
+            if not items:
+                return
+
+            yield from items
+
+            total_pages = (response.get("pagination") or {}).get("total", page)
+            if page >= total_pages or len(items) < perpage:
+                return
+            page += 1
+
     def get_item_details(self, item_id: str) -> dict:
         """
         Get detailed information about specific item
@@ -297,8 +672,7 @@ class KinoPubAPI:
         Returns:
             Dict: Item details
         """
-        params = {"access_token": self.access_token or ""}
-        return self._make_request("GET", f"/v1/items/{item_id}", params=params)
+        return self._make_request("GET", f"/v1/items/{item_id}")
 
     def search_content(self, query: str, page: int = 1, perpage: int = 20) -> dict:
         """
@@ -312,12 +686,7 @@ class KinoPubAPI:
         Returns:
             Dict: Search results
         """
-        params = {
-            "access_token": self.access_token,
-            "q": query,
-            "page": page,
-            "perpage": perpage,
-        }
+        params = {"q": query, "page": page, "perpage": perpage}
 
         return self._make_request("GET", "/v1/items/search", params=params)
 
@@ -328,8 +697,7 @@ class KinoPubAPI:
         Returns:
             Dict: TV channels list
         """
-        params = {"access_token": self.access_token or ""}
-        return self._make_request("GET", "/v1/tv/index", params=params)
+        return self._cached_get("/v1/tv/index", None, TV_CHANNELS_CACHE_TTL)
 
     def get_genres(self, genre_type: str | None = None) -> dict:
         """
@@ -341,8 +709,5 @@ class KinoPubAPI:
         Returns:
             Dict: Genres list
         """
-        params = {"access_token": self.access_token or ""}
-        if genre_type:
-            params["type"] = genre_type
-
-        return self._make_request("GET", "/v1/genres", params=params)
+        params = {"type": genre_type} if genre_type else None
+        return self._cached_get("/v1/genres", params, GENRES_CACHE_TTL)
@@ -7,23 +7,55 @@ Main router for the Kino.pub Kodi addon using CodeQuick framework.
 """
 
 
+import sys
+from urllib.parse import urlsplit
+
 import codequick
 import xbmcaddon
 import xbmcgui
+import xbmcplugin
 
+from ._kodi import LocalizedStrings
 from .api import KinoPubAPI
 from .settings import KinoPubSettings
 from .ui import KinoPubUI
 
+FANART = 'fanart.jpg'
+
+# Directory entry routes by item ID
+PLAY_URL = '/play/%s'
+CHANNEL_URL = '/play/channel/%s'
+GENRE_URL = '/genre/%s'
+
+# Channels or genres listed per page; the API returns them all at once
+LIST_PAGE_SIZE = 50
+
+# Main menu entries: (label string ID, route, icon)
+MAIN_MENU = (
+    (30029, '/movies', 'movies.png'),  # "Movies"
+    (30030, '/tv', 'tv.png'),  # "TV Shows"
+    (30031, '/search', 'search.png'),  # "Search"
+    (30032, '/channels', 'channels.png'),  # "TV Channels"
+    (30033, '/genres', 'genres.png'),  # "Genres"
+    (30034, '/settings', 'settings.png'),  # "Settings"
+)
+
 
 class KinoPubRouter:
     """Main router for Kino.pub addon"""
 
     def __init__(self):
-        self.api = KinoPubAPI()
-        self.ui = KinoPubUI()
-        self.settings = KinoPubSettings()
+        self.handle = int(sys.argv[1])
+
+        # Directory entries need absolute URLs to be routed back to the addon
+        self.base_url = f'plugin://{urlsplit(sys.argv[0]).netloc}'
+
+        # One Addon handle shared by all components
         self.addon = xbmcaddon.Addon()
+        self.strings = LocalizedStrings(self.addon)
+        self.api = KinoPubAPI(addon=self.addon)
+        self.ui = KinoPubUI(addon=self.addon, base_url=self.base_url)
+        self.settings = KinoPubSettings(addon=self.addon)
 
     def run(self):
         """Start the router"""
@@ -41,121 +73,78 @@ class KinoPubRouter:
         # Start device authentication
         if not self.api.start_device_auth():
             dialog.ok(
-                self.addon.getLocalizedString(30018),  # "Authentication Error"
-                self.addon.getLocalizedString(30019)   # "Failed to start authentication"
+                self.strings[30018],  # "Authentication Error"
+                self.strings[30019]   # "Failed to start authentication"
             )
             return False
 
         # Show device activation dialog
         dialog.ok(
-            self.addon.getLocalizedString(30020),  # "Device Activation Required"
-            f"{self.addon.getLocalizedString(30021)}: {self.api.verification_uri}\n\n"  # "Please visit"
-            f"{self.addon.getLocalizedString(30022)}: {self.api.user_code}",  # "Enter this code"
+            self.strings[30020],  # "Device Activation Required"
+            f"{self.strings[30021]}: {self.api.verification_uri}\n\n"  # "Please visit"
+            f"{self.strings[30022]}: {self.api.user_code}",  # "Enter this code"
         )
 
         # Wait for activation
         progress = xbmcgui.DialogProgress()
         progress.create(
-            self.addon.getLocalizedString(30023),  # "Waiting for Activation"
-            self.addon.getLocalizedString(30024)   # "Please complete activation on the website"
+            self.strings[30023],  # "Waiting for Activation"
+            self.strings[30024]   # "Please complete activation on the website"
         )
 
         if self.api.wait_for_activation():
             progress.close()
             dialog.ok(
-                self.addon.getLocalizedString(30025),  # "Success"
-                self.addon.getLocalizedString(30026)   # "Authentication successful"
+                self.strings[30025],  # "Success"
+                self.strings[30026]   # "Authentication successful"
             )
             return True
         else:
             progress.close()
             dialog.ok(
-                self.addon.getLocalizedString(30027),  # "Authentication Failed"
-                self.addon.getLocalizedString(30028)   # "Please try again"
+                self.strings[30027],  # "Authentication Failed"
+                self.strings[30028]   # "Please try again"
             )
             return False
 
     def _show_main_menu(self):
         """Show the main menu"""
-        items = [
-            {
-                'label': self.addon.getLocalizedString(30029),  # "Movies"
-                'url': '/movies',
-                'icon': 'movies.png',
-                'fanart': 'fanart.jpg'
-            },
-            {
-                'label': self.addon.getLocalizedString(30030),  # "TV Shows"
-                'url': '/tv',
-                'icon': 'tv.png',
-                'fanart': 'fanart.jpg'
-            },
-            {
-                'label': self.addon.getLocalizedString(30031),  # "Search"
-                'url': '/search',
-                'icon': 'search.png',
-                'fanart': 'fanart.jpg'
-            },
-            {
-                'label': self.addon.getLocalizedString(30032),  # "TV Channels"
-                'url': '/channels',
-                'icon': 'channels.png',
-                'fanart': 'fanart.jpg'
-            },
-            {
-                'label': self.addon.getLocalizedString(30033),  # "Genres"
-                'url': '/genres',
-                'icon': 'genres.png',
-                'fanart': 'fanart.jpg'
-            },
-            {
-                'label': self.addon.getLocalizedString(30034),  # "Settings"
-                'url': '/settings',
-                'icon': 'settings.png',
-                'fanart': 'fanart.jpg'
-            }
-        ]
-
-        # Add items to Kodi
-        for item in items:
-            list_item = xbmcgui.ListItem(
-                label=item['label'],
-                iconImage=item['icon'],
-                thumbnailImage=item['icon']
-            )
+        entries = []
+        for label_id, url, icon in MAIN_MENU:
+            list_item = xbmcgui.ListItem(label=self.strings[label_id], offscreen=True)
             list_item.setArt({
-                'fanart': item['fanart'],
-                'icon': item['icon'],
-                'thumb': item['icon']
+                'fanart': FANART,
+                'icon': icon,
+                'thumb': icon
             })
 
             # Add context menu
             context_menu = [
-                (self.addon.getLocalizedString(30035), f"RunPlugin({item['url']})")  # "Open"
+                (self.strings[30035], f"RunPlugin({self.base_url}{url})")  # "Open"
             ]
             list_item.addContextMenuItems(context_menu)
 
-            # Add to directory
-            codequick.listitem.add(list_item, item['url'])
+            entries.append((url, list_item, True))
 
-        # Set content type
-        codequick.listitem.set_content_type('videos')
+        self._add_directory_items(entries)
 
     @codequick.route('/movies')
-    def movies(self):
+    @codequick.route('/movies/<int:page>')
+    def movies(self, page: int = 1):
         """Show movies listing"""
-        return self._show_content_list('movie')
+        return self._show_content_list('movie', '/movies', page)
 
     @codequick.route('/tv')
-    def tv_shows(self):
+    @codequick.route('/tv/<int:page>')
+    def tv_shows(self, page: int = 1):
         """Show TV shows listing"""
-        return self._show_content_list('serial')
+        return self._show_content_list('serial', '/tv', page)
 
     @codequick.route('/search')
     def search(self):
         """Show search interface"""
         dialog = xbmcgui.Dialog()
-        query = dialog.input(self.addon.getLocalizedString(30036))  # "Enter search term"
+        query = dialog.input(self.strings[30036])  # "Enter search term"
 
         if query:
             return self._show_search_results(query)
@@ -163,23 +152,25 @@ class KinoPubRouter:
             return self._show_main_menu()
 
     @codequick.route('/channels')
-    def channels(self):
+    @codequick.route('/channels/<int:page>')
+    def channels(self, page: int = 1):
         """Show TV channels"""
         channels_data = self.api.get_tv_channels()
 
         if not channels_data or 'channels' not in channels_data:
-            xbmcgui.Dialog().ok(
-                self.addon.getLocalizedString(30037),  # "Error"
-                self.addon.getLocalizedString(30038)   # "Failed to load channels"
-            )
+            self._show_error(self.strings[30038])  # "Failed to load channels"
             return
 
-        for channel in channels_data['channels']:
+        channels = channels_data['channels']
+        start = (page - 1) * LIST_PAGE_SIZE
+
+        entries = []
+        for channel in channels[start:start + LIST_PAGE_SIZE]:
             list_item = xbmcgui.ListItem(
                 label=channel.get('title', 'Unknown Channel'),
-                iconImage='channel.png',
-                thumbnailImage='channel.png'
+                offscreen=True
             )
+            list_item.setArt({'icon': 'channel.png', 'thumb': 'channel.png'})
 
             # Add stream info
             list_item.setInfo('video', {
@@ -187,34 +178,40 @@ class KinoPubRouter:
                 'plot': channel.get('description', ''),
             })
 
-            # Add to directory
-            codequick.listitem.add(list_item, f"/play/channel/{channel.get('id')}")
+            entries.append((CHANNEL_URL % channel.get('id'), list_item, False))
 
-        codequick.listitem.set_content_type('videos')
+        if start + LIST_PAGE_SIZE < len(channels):
+            entries.append(self._next_page_entry('/channels', page))
+
+        self._add_directory_items(entries)
 
     @codequick.route('/genres')
-    def genres(self):
+    @codequick.route('/genres/<int:page>')
+    def genres(self, page: int = 1):
         """Show genres"""
         genres_data = self.api.get_genres('movie')
 
         if not genres_data or 'genres' not in genres_data:
-            xbmcgui.Dialog().ok(
-                self.addon.getLocalizedString(30037),  # "Error"
-                self.addon.getLocalizedString(30039)   # "Failed to load genres"
-            )
+            self._show_error(self.strings[30039])  # "Failed to load genres"
             return
 
-        for genre in genres_data['genres']:
+        genres = genres_data['genres']
+        start = (page - 1) * LIST_PAGE_SIZE
+
+        entries = []
+        for genre in genres[start:start + LIST_PAGE_SIZE]:
             list_item = xbmcgui.ListItem(
                 label=genre.get('title', 'Unknown Genre'),
-                iconImage='genre.png',
-                thumbnailImage='genre.png'
+                offscreen=True
             )
+            list_item.setArt({'icon': 'genre.png', 'thumb': 'genre.png'})
+
+            entries.append((GENRE_URL % genre.get('id'), list_item, True))
 
-            # Add to directory
-            codequick.listitem.add(list_item, f"/genre/{genre.get('id')}")
+        if start + LIST_PAGE_SIZE < len(genres):
+            entries.append(self._next_page_entry('/genres', page))
 
-        codequick.listitem.set_content_type('videos')
+        self._add_directory_items(entries)
 
     @codequick.route('/settings')
     def settings(self):
@@ -222,36 +219,63 @@ class KinoPubRouter:
         self.addon.openSettings()
         return self._show_main_menu()
 
-    def _show_content_list(self, content_type: str):
+    def _show_content_list(self, content_type: str, route: str, page: int = 1):
         """Show content listing for movies or TV shows"""
-        content_data = self.api.get_items(page=1, perpage=20, type_filter=content_type)
+        content_data = self.api.get_items(
+            page=page, perpage=20, type_filter=content_type
+        )
 
         if not content_data or 'items' not in content_data:
-            xbmcgui.Dialog().ok(
-                self.addon.getLocalizedString(30037),  # "Error"
-                self.addon.getLocalizedString(30040)   # "Failed to load content"
-            )
+            self._show_error(self.strings[30040])  # "Failed to load content"
             return
 
-        for item in content_data['items']:
-            list_item = self.ui.create_content_item(item)
-            codequick.listitem.add(list_item, f"/play/{item.get('id')}")
+        entries = [
+            (PLAY_URL % item.get('id'), self.ui.create_content_item(item), False)
+            for item in content_data['items']
+        ]
 
-        codequick.listitem.set_content_type('videos')
+        total_pages = content_data.get('pagination', {}).get('total', page)
+        has_next_page = page < total_pages
+        if has_next_page:
+            entries.append(self._next_page_entry(route, page))
+
+        self._add_directory_items(entries)
+
+        # The listing is already on screen; fetch the next page while the
+        # user browses it, so turning the page needs no request
+        if has_next_page:
+            self.api.prefetch_items(page=page + 1, perpage=20, type_filter=content_type)
 
     def _show_search_results(self, query: str):
         """Show search results"""
         search_data = self.api.search_content(query, page=1, perpage=20)
 
         if not search_data or 'items' not in search_data:
-            xbmcgui.Dialog().ok(
-                self.addon.getLocalizedString(30037),  # "Error"
-                self.addon.getLocalizedString(30041)   # "No results found"
-            )
+            self._show_error(self.strings[30041])  # "No results found"
             return
 
-        for item in search_data['items']:
-            list_item = self.ui.create_content_item(item)
-            codequick.listitem.add(list_item, f"/play/{item.get('id')}")
-
-        codequick.listitem.set_content_type('videos')
+        entries = [
+            (PLAY_URL % item.get('id'), self.ui.create_content_item(item), False)
+            for item in search_data['items']
+        ]
+        self._add_directory_items(entries)
+
+    def _next_page_entry(self, route: str, page: int) -> tuple:
+        """Create the directory entry leading to route's <int:page> after page"""
+        list_item = xbmcgui.ListItem(label=self.strings[30045], offscreen=True)  # "Next page"
+        return (f'{route}/{page + 1}', list_item, True)
+
+    def _show_error(self, message: str):
+        """Show an error dialog and close the directory Kodi is waiting on"""
+        xbmcgui.Dialog().ok(self.strings[30037], message)  # "Error"
+        xbmcplugin.endOfDirectory(self.handle, succeeded=False)
+
+    def _add_directory_items(self, entries: list):
+        """Add (route, list_item, is_folder) entries to Kodi in a single call"""
+        entries = [
+            (self.base_url + route, list_item, is_folder)
+            for route, list_item, is_folder in entries
+        ]
+        xbmcplugin.addDirectoryItems(self.handle, entries, len(entries))
+        xbmcplugin.setContent(self.handle, 'videos')
+        xbmcplugin.endOfDirectory(self.handle, cacheToDisc=True)
@@ -6,124 +6,161 @@ Kino.pub Settings
 Settings management for the Kino.pub Kodi addon.
 """
 
+from collections.abc import Callable
+from typing import Any, TypeVar
 
 import xbmcaddon
 
+from ._kodi import LocalizedStrings
+
+T = TypeVar('T')
+
+# Setting value parsers and formatters by Python type; Kodi stores strings
+PARSERS: dict[type, Callable[[str], Any]] = {
+    bool: lambda value: value == 'true',
+    int: int,
+    float: float,
+    str: str,
+}
+FORMATTERS: dict[type, Callable[[Any], str]] = {
+    bool: lambda value: 'true' if value else 'false',
+    int: lambda value: str(int(value)),
+    float: lambda value: str(float(value)),
+    str: str,
+}
+
 
 class KinoPubSettings:
     """Settings management for Kino.pub addon"""
 
-    def __init__(self):
-        self.addon = xbmcaddon.Addon()
+    def __init__(self, addon: Any = None) -> None:
+        self.addon = addon or xbmcaddon.Addon()
+        self.strings = LocalizedStrings(self.addon)
+
+        # Setting values read so far; Kodi reparses settings.xml on every read
+        self._cache: dict[str, str] = {}
 
     def get_video_quality(self) -> str:
         """Get preferred video quality setting"""
-        return self.addon.getSetting('video_quality') or 'auto'
+        return self._get_typed('video_quality', str, 'auto')
 
     def set_video_quality(self, quality: str):
         """Set preferred video quality setting"""
-        self.addon.setSetting('video_quality', quality)
+        self.set_setting('video_quality', quality)
 
     def get_subtitle_language(self) -> str:
         """Get preferred subtitle language setting"""
-        return self.addon.getSetting('subtitle_language') or 'ru'
+        return self._get_typed('subtitle_language', str, 'ru')
 
     def set_subtitle_language(self, language: str):
         """Set preferred subtitle language setting"""
-        self.addon.setSetting('subtitle_language', language)
+        self.set_setting('subtitle_language', language)
 
     def get_interface_theme(self) -> str:
         """Get interface theme setting"""
-        return self.addon.getSetting('interface_theme') or 'dark'
+        return self._get_typed('interface_theme', str, 'dark')
 
     def set_interface_theme(self, theme: str):
         """Set interface theme setting"""
-        self.addon.setSetting('interface_theme', theme)
+        self.set_setting('interface_theme', theme)
 
     def get_parental_controls(self) -> bool:
         """Get parental controls setting"""
-        return self.addon.getSetting('parental_controls') == 'true'
+        return self._get_typed('parental_controls', bool, False)
 
     def set_parental_controls(self, enabled: bool):
         """Set parental controls setting"""
-        self.addon.setSetting('parental_controls', 'true' if enabled else 'false')
+        self._set_typed('parental_controls', bool, enabled)
 
     def get_auto_login(self) -> bool:
         """Get auto login setting"""
-        return self.addon.getSetting('auto_login') == 'true'
+        return self._get_typed('auto_login', bool, False)
 
     def set_auto_login(self, enabled: bool):
         """Set auto login setting"""
-        self.addon.setSetting('auto_login', 'true' if enabled else 'false')
+        self._set_typed('auto_login', bool, enabled)
 
     def get_cache_enabled(self) -> bool:
         """Get cache enabled setting"""
-        return self.addon.getSetting('cache_enabled') == 'true'
+        return self._get_typed('cache_enabled', bool, False)
 
     def set_cache_enabled(self, enabled: bool):
         """Set cache enabled setting"""
-        self.addon.setSetting('cache_enabled', 'true' if enabled else 'false')
+        self._set_typed('cache_enabled', bool, enabled)
 
     def get_cache_duration(self) -> int:
         """Get cache duration setting in seconds"""
-        try:
-            return int(self.addon.getSetting('cache_duration') or '3600')
-        except ValueError:
-            return 3600
+        return self._get_typed('cache_duration', int, 3600)
 
     def set_cache_duration(self, duration: int):
         """Set cache duration setting in seconds"""
-        self.addon.setSetting('cache_duration', str(duration))
+        self._set_typed('cache_duration', int, duration)
 
     def get_setting(self, setting_id: str) -> str:
         """Get any setting by ID"""
-        return self.addon.getSetting(setting_id) or ''
+        value = self._cache.get(setting_id)
+        if value is None:
+            value = self._cache[setting_id] = self.addon.getSetting(setting_id) or ''
+        return value
 
     def set_setting(self, setting_id: str, value: str):
         """Set any setting by ID"""
         self.addon.setSetting(setting_id, value)
+        self._cache[setting_id] = value
+
+    def _get_typed(self, setting_id: str, type_: type[T], default: T) -> T:
+        """Get setting parsed as type_, default if unset or malformed"""
+        value = self.get_setting(setting_id)
+        if not value:
+            return default
+        try:
+            parsed: T = PARSERS[type_](value)
+        except ValueError:
+            return default
+        return parsed
+
+    def _set_typed(self, setting_id: str, type_: type, value: Any) -> None:
+        """Set setting formatted as type_"""
+        self.set_setting(setting_id, FORMATTERS[type_](value))
 
     def get_boolean_setting(self, setting_id: str) -> bool:
         """Get boolean setting by ID"""
-        return self.addon.getSetting(setting_id) == 'true'
+        return self._get_typed(setting_id, bool, False)
 
     def set_boolean_setting(self, setting_id: str, value: bool):
         """Set boolean setting by ID"""
-        self.addon.setSetting(setting_id, 'true' if value else 'false')
+        self._set_typed(setting_id, bool, value)
 
     def get_int_setting(self, setting_id: str, default: int = 0) -> int:
         """Get integer setting by ID"""
-        try:
-            return int(self.addon.getSetting(setting_id) or str(default))
-        except ValueError:
-            return default
+        return self._get_typed(setting_id, int, default)
 
     def set_int_setting(self, setting_id: str, value: int):
         """Set integer setting by ID"""
-        self.addon.setSetting(setting_id, str(value))
+        self._set_typed(setting_id, int, value)
 
     def get_float_setting(self, setting_id: str, default: float = 0.0) -> float:
         """Get float setting by ID"""
-        try:
-            return float(self.addon.getSetting(setting_id) or str(default))
-        except ValueError:
-            return default
+        return self._get_typed(setting_id, float, default)
 
     def set_float_setting(self, setting_id: str, value: float):
         """Set float setting by ID"""
-        self.addon.setSetting(setting_id, str(value))
+        self._set_typed(setting_id, float, value)
 
     def open_settings(self):
         """Open addon settings dialog"""
         self.addon.openSettings()
 
+        # The user may have changed anything in the dialog
+        self._cache.clear()
+
     def get_addon_info(self, info_id: str) -> str:
         """Get addon information"""
         return self.addon.getAddonInfo(info_id)
 
     def get_localized_string(self, string_id: int) -> str:
         """Get localized string"""
-        return self.addon.getLocalizedString(string_id)
+        return self.strings[string_id]
 
     def get_quality_options(self) -> list:
         """Get available quality options"""
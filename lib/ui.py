@@ -11,12 +11,28 @@ from typing import Any
 import xbmcaddon
 import xbmcgui
 
+from ._kodi import LocalizedStrings
+
+# Kodi media type by kino.pub content type
+MEDIA_TYPES = {"movie": "movie", "serial": "tvshow"}
+
+# Content item context menu: (label string ID, route template)
+CONTEXT_MENU = (
+    (30042, "/watchlist/add/%s"),  # "Add to Watchlist"
+    (30043, "/details/%s"),  # "Show Details"
+    (30044, "/play/quality/%s"),  # "Play with Quality Selection"
+)
+
 
 class KinoPubUI:
     """UI components for Kino.pub addon"""
 
-    def __init__(self):
-        self.addon = xbmcaddon.Addon()
+    def __init__(self, addon: Any = None, base_url: str | None = None) -> None:
+        self.addon = addon or xbmcaddon.Addon()
+        self.strings = LocalizedStrings(self.addon)
+
+        # Plugin URL the context menu routes are resolved against
+        self.base_url = base_url or f"plugin://{self.addon.getAddonInfo('id')}"
 
     def create_content_item(self, item: dict[str, Any]) -> xbmcgui.ListItem:
         """
@@ -34,35 +50,34 @@ class KinoPubUI:
         plot = item.get("plot", "")
         type_ = item.get("type", "")
 
-        # Create list item
-        list_item = xbmcgui.ListItem(
-            label=title,
-            iconImage=self._get_item_icon(item),
-            thumbnailImage=self._get_item_thumbnail(item),
-        )
-
-        # Set art
-        list_item.setArt(
-            {
-                "fanart": self._get_item_fanart(item),
-                "icon": self._get_item_icon(item),
-                "thumb": self._get_item_thumbnail(item),
-                "poster": self._get_item_poster(item),
-            }
-        )
+        # Create list item; offscreen skips the GUI lock while it is populated
+        list_item = xbmcgui.ListItem(label=title, offscreen=True)
+
+        # Set art; only real URLs are added on top of the icon, Kodi already
+        # falls back to the icon and the addon fanart for missing keys
+        art = {"icon": self._get_item_icon(item)}
+        poster = self._get_poster_url(item)
+        if poster:
+            art["thumb"] = art["poster"] = poster
+        fanart = self._get_fanart_url(item)
+        if fanart:
+            art["fanart"] = fanart
+        list_item.setArt(art)
 
         # Set video info
+        genres = item.get("genres") or ()
+        rating = item.get("rating") or {}
         video_info = {
             "title": title,
             "year": year,
             "plot": plot,
-            "genre": self._get_genres(item),
-            "director": self._get_director(item),
-            "cast": self._get_cast(item),
-            "duration": self._get_duration(item),
-            "rating": self._get_rating(item),
-            "mpaa": self._get_mpaa(item),
-            "mediatype": self._get_mediatype(type_),
+            "genre": ", ".join(g.get("title", "") for g in genres),
+            "director": item.get("director") or "",
+            "cast": item.get("cast") or "",
+            "duration": int(item.get("duration") or 0),
+            "rating": float(rating.get("kp", 0.0)),
+            "mpaa": item.get("mpaa") or "",
+            "mediatype": MEDIA_TYPES.get(type_, "video"),
         }
 
         list_item.setInfo("video", video_info)
@@ -88,108 +103,31 @@ class KinoPubUI:
         else:
             return "video.png"
 
-    def _get_item_thumbnail(self, item: dict[str, Any]) -> str:
-        """Get item thumbnail path"""
-        # Use poster if available, otherwise default
-        poster = item.get("poster", {})
-        if poster and "url" in poster:
-            return poster["url"]
-        return self._get_item_icon(item)
-
-    def _get_item_poster(self, item: dict[str, Any]) -> str:
-        """Get item poster path"""
+    def _get_poster_url(self, item: dict[str, Any]) -> str:
+        """Get item poster URL, empty if the item has none"""
         poster = item.get("poster", {})
         if poster and "url" in poster:
             return poster["url"]
-        return self._get_item_icon(item)
+        return ""
 
-    def _get_item_fanart(self, item: dict[str, Any]) -> str:
-        """Get item fanart path"""
+    def _get_fanart_url(self, item: dict[str, Any]) -> str:
+        """Get item fanart URL, empty if the item has none"""
         fanart = item.get("fanart", {})
         if fanart and "url" in fanart:
             return fanart["url"]
-        return "fanart.jpg"
-
-    def _get_genres(self, item: dict[str, Any]) -> str:
-        """Get genres as string"""
-        genres = item.get("genres", [])
-        if genres:
-            return ", ".join([g.get("title", "") for g in genres])
         return ""
 
-    def _get_director(self, item: dict[str, Any]) -> str:
-        """Get director as string"""
-        director = item.get("director", "")
-        if director:
-            return director
-        return ""
-
-    def _get_cast(self, item: dict[str, Any]) -> str:
-        """Get cast as string"""
-        cast = item.get("cast", "")
-        if cast:
-            return cast
-        return ""
-
-    def _get_duration(self, item: dict[str, Any]) -> int:
-        """Get duration in minutes"""
-        duration = item.get("duration", 0)
-        if duration:
-            return int(duration)
-        return 0
-
-    def _get_rating(self, item: dict[str, Any]) -> float:
-        """Get rating"""
-        rating = item.get("rating", {})
-        if rating and "kp" in rating:
-            return float(rating["kp"])
-        return 0.0
-
-    def _get_mpaa(self, item: dict[str, Any]) -> str:
-        """Get MPAA rating"""
-        mpaa = item.get("mpaa", "")
-        if mpaa:
-            return mpaa
-        return ""
-
-    def _get_mediatype(self, type_: str) -> str:
-        """Get Kodi media type"""
-        if type_ == "movie":
-            return "movie"
-        elif type_ == "serial":
-            return "tvshow"
-        else:
-            return "video"
-
     def _create_context_menu(self, item: dict[str, Any]) -> list:
         """Create context menu for item"""
-        context_menu = []
-
-        # Add to watchlist
-        context_menu.append(
-            (
-                self.addon.getLocalizedString(30042),  # "Add to Watchlist"
-                f"RunPlugin(/watchlist/add/{item.get('id')})",
-            )
-        )
-
-        # Show details
-        context_menu.append(
-            (
-                self.addon.getLocalizedString(30043),  # "Show Details"
-                f"RunPlugin(/details/{item.get('id')})",
-            )
-        )
-
-        # Play with quality selection
-        context_menu.append(
-            (
-                self.addon.getLocalizedString(30044),  # "Play with Quality Selection"
-                f"RunPlugin(/play/quality/{item.get('id')})",
-            )
-        )
+        item_id = item.get("id")
+        return [
+            (self.strings[label_id], self._run_plugin(route % item_id))
+            for label_id, route in CONTEXT_MENU
+        ]
 
-        return context_menu
+    def _run_plugin(self, route: str) -> str:
+        """Build the RunPlugin action for an addon route"""
+        return f"RunPlugin({self.base_url}{route})"
 
     def show_error_dialog(self, title: str, message: str):
         """Show error dialog"""
@@ -227,7 +165,10 @@ class KinoPubUI:
                 label += f" ({quality['size']})"
 
             menu_items.append(
-                (label, f"RunPlugin(/play/quality/{item_id}/{quality.get('id')})")
+                (
+                    label,
+                    self._run_plugin(f"/play/quality/{item_id}/{quality.get('id')}"),
+                )
             )
 
         return menu_items
@@ -7,12 +7,79 @@ Script to build and package the Kino.pub Kodi addon for distribution.
 """
 
 import os
-import shutil
+import re
+import stat
 import sys
 import zipfile
 from datetime import datetime
 from pathlib import Path
 
+# Directory names, file names and file suffixes left out of the packages
+EXCLUDE_DIRS = frozenset({"__pycache__", ".git", "tests", "scripts"})
+EXCLUDE_FILES = frozenset(
+    {
+        ".DS_Store",
+        "Thumbs.db",
+        ".gitignore",
+        "api-test.py",
+        "pyproject.toml",
+        "requirements.txt",
+    }
+)
+EXCLUDE_SUFFIXES = (".pyc", ".pyo")
+
+# Version attribute of the <addon> element, not of the <?xml ?> declaration
+VERSION_RE = re.compile(rb'<addon\b[^>]*?\sversion="([^"]+)"')
+
+# Print build progress once per this many added files
+PROGRESS_EVERY = 100
+
+# Already compressed formats, stored as is instead of deflated again
+STORED_SUFFIXES = (".png", ".jpg", ".jpeg", ".zip", ".gz")
+
+# Fast deflate level for text sources; the bundle is small either way
+DEFLATE_LEVEL = 1
+
+
+def iter_files(directory):
+    """Yield archive names of files under directory, skipping excluded paths"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if entry.name not in EXCLUDE_DIRS:
+                    yield from iter_files(entry.path)
+            elif not (
+                entry.name in EXCLUDE_FILES or entry.name.endswith(EXCLUDE_SUFFIXES)
+            ):
+                yield os.path.relpath(entry.path).replace(os.sep, "/")
+
+
+def iter_sources(path):
+    """Yield archive names for an include path, nothing if it does not exist"""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        print(f"Warning: {path} not found")
+        return
+
+    if stat.S_ISDIR(mode):
+        yield from iter_files(path)
+    else:
+        yield path
+
+
+def write_file(zipf, file_path, arcname):
+    """Add a file to the archive, deflating only compressible content"""
+    if arcname.lower().endswith(STORED_SUFFIXES):
+        zipf.write(file_path, arcname, compress_type=zipfile.ZIP_STORED)
+    else:
+        zipf.write(
+            file_path,
+            arcname,
+            compress_type=zipfile.ZIP_DEFLATED,
+            compresslevel=DEFLATE_LEVEL,
+        )
+
 
 def get_addon_version():
     """Get addon version from addon.xml"""
@@ -20,15 +87,11 @@ def get_addon_version():
     if not addon_xml_path.exists():
         return "1.0.0"
 
-    with open(addon_xml_path, encoding="utf-8") as f:
-        content = f.read()
-        # Simple version extraction
-        if 'version="' in content:
-            start = content.find('version="') + 9
-            end = content.find('"', start)
-            return content[start:end]
+    # The <addon> element opens the file, so its first page is enough
+    with open(addon_xml_path, "rb") as f:
+        match = VERSION_RE.search(f.read(4096))
 
-    return "1.0.0"
+    return match.group(1).decode() if match else "1.0.0"
 
 
 def create_addon_package():
@@ -47,58 +110,29 @@ def create_addon_package():
         "README.md",
     ]
 
-    # Files to exclude
-    exclude_patterns = [
-        "__pycache__",
-        "*.pyc",
-        "*.pyo",
-        ".DS_Store",
-        "Thumbs.db",
-        ".git",
-        ".gitignore",
-        "tests/",
-        "scripts/",
-        "api-test.py",
-        "pyproject.toml",
-        "requirements.txt",
-    ]
-
     print(f"Building addon package: {package_name}")
     print(f"Version: {version}")
     print(f"Timestamp: {timestamp}")
 
+    added = 0
     with zipfile.ZipFile(package_name, "w", zipfile.ZIP_DEFLATED) as zipf:
         for include_path in include_paths:
-            if os.path.exists(include_path):
-                if os.path.isdir(include_path):
-                    # Add directory contents
-                    for root, dirs, files in os.walk(include_path):
-                        # Filter out excluded directories
-                        dirs[:] = [d for d in dirs if d not in exclude_patterns]
-
-                        for file in files:
-                            file_path = os.path.join(root, file)
-
-                            # Check if file should be excluded
-                            should_exclude = False
-                            for pattern in exclude_patterns:
-                                if pattern in file_path or file_path.endswith(pattern):
-                                    should_exclude = True
-                                    break
-
-                            if not should_exclude:
-                                arcname = os.path.relpath(file_path)
-                                print(f"Adding: {arcname}")
-                                zipf.write(file_path, arcname)
-                else:
-                    # Add single file
-                    print(f"Adding: {include_path}")
-                    zipf.write(include_path, include_path)
-            else:
-                print(f"Warning: {include_path} not found")
+            for arcname in iter_sources(include_path):
+                write_file(zipf, arcname, arcname)
+                added += 1
+                if added % PROGRESS_EVERY == 0:
+                    print(f"Added {added} files...")
+
+        entries = zipf.infolist()
+        file_size = sum(entry.file_size for entry in entries)
+        compress_size = sum(entry.compress_size for entry in entries)
 
+    print(f"Added {added} files")
     print(f"\nPackage created successfully: {package_name}")
-    print(f"Package size: {os.path.getsize(package_name) / 1024:.1f} KB")
+    print(
+        f"Package contents: {compress_size / 1024:.1f} KB "
+        f"({file_size / 1024:.1f} KB uncompressed)"
+    )
 
     return package_name
 
@@ -109,15 +143,7 @@ def create_repository_package():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     repo_name = f"kinopub-repository-{version}-{timestamp}.zip"
 
-    # Create repository structure
-    repo_dir = Path("repository")
-    repo_dir.mkdir(exist_ok=True)
-
-    # Copy addon to repository
-    addon_dir = repo_dir / "plugin.video.kinopub"
-    addon_dir.mkdir(exist_ok=True)
-
-    # Copy addon files
+    # Addon files, packed under repository/plugin.video.kinopub/
     addon_files = [
         "addon.xml",
         "default.py",
@@ -125,16 +151,6 @@ def create_repository_package():
         "resources/",
     ]
 
-    for file_path in addon_files:
-        src = Path(file_path)
-        dst = addon_dir / file_path
-
-        if src.exists():
-            if src.is_dir():
-                shutil.copytree(src, dst, dirs_exist_ok=True)
-            else:
-                shutil.copy2(src, dst)
-
     # Create repository.xml
     repo_xml_content = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <addons>
@@ -162,19 +178,18 @@ def create_repository_package():
     </addon>
 </addons>"""
 
-    with open(repo_dir / "repository.xml", "w", encoding="utf-8") as f:
-        f.write(repo_xml_content)
-
-    # Create ZIP package
+    # Create ZIP package straight from the sources, without a scratch copy
     with zipfile.ZipFile(repo_name, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for root, _dirs, files in os.walk(repo_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, repo_dir.parent)
-                zipf.write(file_path, arcname)
-
-    # Clean up
-    shutil.rmtree(repo_dir)
+        for file_path in addon_files:
+            for arcname in iter_sources(file_path):
+                write_file(zipf, arcname, f"repository/plugin.video.kinopub/{arcname}")
+
+        zipf.writestr(
+            "repository/repository.xml",
+            repo_xml_content,
+            compress_type=zipfile.ZIP_DEFLATED,
+            compresslevel=DEFLATE_LEVEL,
+        )
 
     print(f"Repository package created: {repo_name}")
     return repo_name
@@ -7,25 +7,30 @@ This file provides test fixtures and configuration for testing the Kino.pub addo
 outside of a Kodi environment using Kodistubs.
 """
 
+import importlib.util
+import json
+import os
 import sys
-from pathlib import Path
-from unittest.mock import MagicMock
+from types import MappingProxyType, SimpleNamespace
 
 import pytest
 
-# Add the lib directory to the Python path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent / "lib"))
-
-# Import Kodistubs to provide Kodi module stubs
-try:
-    import codequick
-    import xbmcaddon
-    import xbmcgui
-    import xbmcplugin
-    import xbmcvfs
-except ImportError:
-    # If Kodistubs is not available, create basic mocks
+# Kodi modules imported by the addon; Kodistubs ships all but codequick
+KODI_MODULES = ("codequick", "xbmc", "xbmcaddon", "xbmcgui", "xbmcplugin", "xbmcvfs")
+
+# Addon profile directory reported by the mocks, set by test_profile_dir
+PROFILE = SimpleNamespace(path="")
+
+# Module names added to sys.modules by _install_mocks, removed after the session
+INJECTED = set()
+
+
+def _install_mocks(names):
+    """Install basic mocks for the named Kodi modules that are not available"""
+
     class MockAddon:
+        __slots__ = ("settings",)
+
         def __init__(self):
             self.settings = {}
 
@@ -40,14 +45,18 @@ except ImportError:
 
         def getAddonInfo(self, info_type: str) -> str:
             if info_type == "profile":
-                return str(Path(__file__).parent / "test_profile")
+                return PROFILE.path
             return ""
 
         def openSettings(self):
             pass
 
     class MockListItem:
-        def __init__(self):
+        __slots__ = ("label", "art", "info", "properties", "context_menu")
+
+        # Kodi 19 signature; the removed iconImage/thumbnailImage raise TypeError
+        def __init__(self, label="", label2="", path="", offscreen=False):
+            self.label = label
             self.art = {}
             self.info = {}
             self.properties = {}
@@ -66,6 +75,8 @@ except ImportError:
             self.context_menu.extend(items)
 
     class MockDialog:
+        __slots__ = ()
+
         def ok(self, heading, line1, line2="", line3=""):
             return True
 
@@ -76,6 +87,8 @@ except ImportError:
             return "test_input"
 
     class MockDialogProgress:
+        __slots__ = ()
+
         def create(self, heading, line1="", line2="", line3=""):
             pass
 
@@ -85,86 +98,146 @@ except ImportError:
         def close(self):
             pass
 
+    class MockMonitor:
+        __slots__ = ()
+
+        def abortRequested(self):
+            return False
+
+        def waitForAbort(self, timeout=-1):
+            return False
+
     # Create mock modules
-    mock_xbmcaddon = MagicMock()
-    mock_xbmcaddon.Addon.return_value = MockAddon()
+    def noop(*args, **kwargs):
+        return None
+
+    addon = MockAddon()
+
+    mock_xbmc = SimpleNamespace(Monitor=MockMonitor)
+
+    mock_xbmcaddon = SimpleNamespace(Addon=lambda *args: addon)
 
-    mock_xbmcvfs = MagicMock()
-    mock_xbmcvfs.translatePath.return_value = str(
-        Path(__file__).parent / "test_profile"
+    mock_xbmcvfs = SimpleNamespace(
+        translatePath=lambda path: path, exists=os.path.exists
     )
 
-    mock_xbmcgui = MagicMock()
-    mock_xbmcgui.ListItem.side_effect = MockListItem
-    mock_xbmcgui.Dialog.return_value = MockDialog()
-    mock_xbmcgui.DialogProgress.return_value = MockDialogProgress()
+    mock_xbmcgui = SimpleNamespace(
+        ListItem=MockListItem,
+        Dialog=MockDialog,
+        DialogProgress=MockDialogProgress,
+    )
+
+    mock_xbmcplugin = SimpleNamespace(
+        addDirectoryItems=noop, setContent=noop, endOfDirectory=noop
+    )
+
+    mock_codequick = SimpleNamespace(route=lambda path: lambda func: func)
 
-    mock_xbmcplugin = MagicMock()
+    mocks = {
+        "codequick": mock_codequick,
+        "xbmc": mock_xbmc,
+        "xbmcaddon": mock_xbmcaddon,
+        "xbmcgui": mock_xbmcgui,
+        "xbmcplugin": mock_xbmcplugin,
+        "xbmcvfs": mock_xbmcvfs,
+    }
 
-    mock_codequick = MagicMock()
-    mock_codequick.route.side_effect = lambda x: x
-    mock_codequick.listitem = MagicMock()
+    # Add the missing modules to sys.modules, keeping any real stubs
+    for name in names:
+        sys.modules[name] = mocks[name]
+        INJECTED.add(name)
+
+
+# Probe without importing anything; only modules that can't be found are mocked
+missing = [name for name in KODI_MODULES if importlib.util.find_spec(name) is None]
+if missing:
+    _install_mocks(missing)
+
+
+def _freeze(value):
+    """Return a read-only view of nested dicts and lists for shared fixtures"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+# Shared read-only payloads, parsed once from JSON; copy one with dict() before
+# modifying it
+_PAYLOAD = _freeze(
+    json.loads(
+        """
+        {
+            "api": {
+                "items": [
+                    {
+                        "id": "123",
+                        "title": "Test Movie",
+                        "type": "movie",
+                        "year": 2024,
+                        "plot": "A test movie for testing",
+                        "genre": ["Action", "Adventure"],
+                        "director": "Test Director",
+                        "cast": ["Actor 1", "Actor 2"],
+                        "duration": 120,
+                        "rating": 8.5,
+                        "mpaa": "PG-13",
+                        "poster": "https://example.com/poster.jpg",
+                        "fanart": "https://example.com/fanart.jpg"
+                    }
+                ],
+                "pagination": {"page": 1, "perpage": 10, "total": 1}
+            },
+            "auth": {
+                "code": "test_device_code",
+                "user_code": "TEST123",
+                "verification_uri": "https://kino.pub/device",
+                "expires_in": 600,
+                "interval": 5
+            },
+            "token": {
+                "access_token": "test_access_token",
+                "refresh_token": "test_refresh_token",
+                "expires_in": 3600,
+                "token_type": "Bearer"
+            }
+        }
+        """
+    )
+)
 
-    # Replace modules in sys.modules
-    sys.modules["xbmcaddon"] = mock_xbmcaddon
-    sys.modules["xbmcvfs"] = mock_xbmcvfs
-    sys.modules["xbmcgui"] = mock_xbmcgui
-    sys.modules["xbmcplugin"] = mock_xbmcplugin
-    sys.modules["codequick"] = mock_codequick
 
+@pytest.fixture(scope="session", autouse=True)
+def _sysmod_guard():
+    """Remove the injected Kodi mocks from sys.modules when the session ends"""
+    yield
+    for name in INJECTED:
+        sys.modules.pop(name, None)
+    INJECTED.clear()
 
-@pytest.fixture(scope="session")
-def test_profile_dir():
-    """Create a temporary test profile directory"""
-    profile_dir = Path(__file__).parent / "test_profile"
-    profile_dir.mkdir(exist_ok=True)
-    yield profile_dir
-    # Cleanup is handled by the test framework
 
+@pytest.fixture(scope="session", autouse=True)
+def test_profile_dir(tmp_path_factory):
+    """Create a temporary test profile directory outside the repository"""
+    profile_dir = tmp_path_factory.mktemp("test_profile")
+    PROFILE.path = str(profile_dir)
+    return profile_dir
 
-@pytest.fixture
+
+@pytest.fixture(scope="session")
 def mock_api_response():
     """Mock API response data for testing"""
-    return {
-        "items": [
-            {
-                "id": "123",
-                "title": "Test Movie",
-                "type": "movie",
-                "year": 2024,
-                "plot": "A test movie for testing",
-                "genre": ["Action", "Adventure"],
-                "director": "Test Director",
-                "cast": ["Actor 1", "Actor 2"],
-                "duration": 120,
-                "rating": 8.5,
-                "mpaa": "PG-13",
-                "poster": "https://example.com/poster.jpg",
-                "fanart": "https://example.com/fanart.jpg",
-            }
-        ],
-        "pagination": {"page": 1, "perpage": 10, "total": 1},
-    }
+    return _PAYLOAD["api"]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_auth_response():
     """Mock authentication response data"""
-    return {
-        "code": "test_device_code",
-        "user_code": "TEST123",
-        "verification_uri": "https://kino.pub/device",
-        "expires_in": 600,
-        "interval": 5,
-    }
+    return _PAYLOAD["auth"]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_token_response():
     """Mock token response data"""
-    return {
-        "access_token": "test_access_token",
-        "refresh_token": "test_refresh_token",
-        "expires_in": 3600,
-        "token_type": "Bearer",
-    }
+    return _PAYLOAD["token"]
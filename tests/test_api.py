@@ -6,46 +6,91 @@ Unit tests for Kino.pub API client
 Tests for the KinoPubAPI class functionality.
 """
 
-import sys
-from pathlib import Path
-from unittest.mock import patch
+import itertools
+import json
+import time
+from unittest.mock import DEFAULT, Mock, patch
 
 import pytest
-
-# Add the parent directory to the Python path to import lib
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import requests
 
 from lib.api import KinoPubAPI
 
 
+@pytest.fixture(scope="class")
+def kodi_mocks():
+    """Patch the Kodi addon and filesystem modules once per test class"""
+    with patch.multiple("lib.api", xbmcaddon=DEFAULT, xbmcvfs=DEFAULT) as mocks:
+        yield mocks
+
+
 class TestKinoPubAPI:
     """Test cases for KinoPubAPI class"""
 
-    def setup_method(self):
-        """Set up test fixtures"""
-        with patch("lib.api.xbmcaddon.Addon"):
-            with patch("lib.api.xbmcvfs"):
-                self.api = KinoPubAPI()
+    @pytest.fixture
+    def api(self, kodi_mocks):
+        """Fresh API client without cached tokens"""
+        return KinoPubAPI()
 
-    def test_init(self):
+    @pytest.fixture
+    def mock_request(self, api):
+        """Stub the fixture client's _make_request, returning an empty listing"""
+        api._make_request = Mock(return_value={"items": []})
+        return api._make_request
+
+    def test_init(self, api):
         """Test API initialization"""
-        assert self.api.base_url == "https://api.service-kp.com"
-        assert self.api.client_id == "xbmc"
-        assert self.api.client_secret == "cgg3gtifu46urtfp2zp1nqtba0k2ezxh"
-        assert self.api.access_token is None
-        assert self.api.refresh_token is None
+        assert api.base_url == "https://api.service-kp.com"
+        assert api.client_id == "xbmc"
+        assert api.client_secret == "cgg3gtifu46urtfp2zp1nqtba0k2ezxh"
+        assert api.access_token is None
+        assert api.refresh_token is None
+
+    def test_init_reuses_given_addon(self, kodi_mocks):
+        """Test an injected Addon handle is used instead of a new one"""
+        addon = Mock()
+        mock_addon = kodi_mocks["xbmcaddon"].Addon
+        mock_addon.reset_mock()
+
+        KinoPubAPI(addon=addon)
+
+        mock_addon.assert_not_called()
+        addon.getAddonInfo.assert_called_once_with("profile")
+
+    def test_init_outside_kodi(self, kodi_mocks):
+        """Test a client opting out of Kodi keeps no profile cache"""
+        mock_addon = kodi_mocks["xbmcaddon"].Addon
+        mock_addon.reset_mock()
+
+        with patch.object(KinoPubAPI, "IN_KODI", False):
+            api = KinoPubAPI()
+
+        mock_addon.assert_not_called()
+        assert api._get_cache_path() is None
+
+    def test_session_adapter(self, api):
+        """Test HTTPS adapter has pooling and retries configured"""
+        adapter = api.session.get_adapter("https://api.service-kp.com")
+
+        assert adapter.max_retries.total == 3
+        assert 503 in adapter.max_retries.status_forcelist
 
-    def test_is_authenticated_false(self):
+    def test_accept_encoding(self, api):
+        """Test compressed responses are advertised"""
+        assert "gzip" in api.session.headers["Accept-Encoding"]
+
+    def test_is_authenticated_false(self, api):
         """Test authentication check when not authenticated"""
-        assert self.api.is_authenticated() is False
+        assert api.is_authenticated() is False
 
-    def test_is_authenticated_true(self):
+    def test_is_authenticated_true(self, api):
         """Test authentication check when authenticated"""
-        self.api.access_token = "test_token"
-        assert self.api.is_authenticated() is True
+        api.access_token = "test_token"
+        assert api.is_authenticated() is True
 
+    @patch("lib.api.KinoPubAPI._save_tokens")
     @patch("lib.api.KinoPubAPI._make_request")
-    def test_start_device_auth_success(self, mock_make_request):
+    def test_start_device_auth_success(self, mock_make_request, mock_save_tokens, api):
         """Test successful device authentication start"""
         mock_make_request.return_value = {
             "code": "test_device_code",
@@ -55,53 +100,404 @@ class TestKinoPubAPI:
             "interval": 5,
         }
 
-        result = self.api.start_device_auth()
+        result = api.start_device_auth()
 
         assert result is True
-        assert self.api.device_code == "test_device_code"
-        assert self.api.user_code == "TEST123"
-        assert self.api.verification_uri == "https://kino.pub/device"
+        assert api.device_code == "test_device_code"
+        assert api.user_code == "TEST123"
+        assert api.verification_uri == "https://kino.pub/device"
+        assert api.device_code_expires_at is not None
         mock_make_request.assert_called_once()
+        mock_save_tokens.assert_called_once()
+
+    @patch("lib.api.KinoPubAPI._make_request")
+    def test_start_device_auth_reuses_cached_code(self, mock_make_request, api):
+        """Test a still valid device code is reused without a request"""
+        api.device_code = "cached_device_code"
+        api.device_code_expires_at = time.time() + 300
+
+        result = api.start_device_auth()
+
+        assert result is True
+        assert api.device_code == "cached_device_code"
+        assert 0 < api.expires_in <= 300
+        mock_make_request.assert_not_called()
 
     @patch("lib.api.KinoPubAPI._make_request")
-    def test_start_device_auth_failure(self, mock_make_request):
+    def test_start_device_auth_restores_cached_interval(
+        self, mock_make_request, tmp_path, api
+    ):
+        """Test a reused device code keeps the server-issued poll interval"""
+        api.device_code = "cached_device_code"
+        api.device_code_expires_at = time.time() + 300
+        api.interval = 2
+
+        with patch.object(api, "_get_cache_path", return_value=str(tmp_path)):
+            api._save_tokens()
+        restored = KinoPubAPI()
+        restored._load_tokens(str(tmp_path))
+
+        assert restored.start_device_auth() is True
+        assert restored.device_code == "cached_device_code"
+        assert restored.interval == 2
+        mock_make_request.assert_not_called()
+
+    @patch("lib.api.KinoPubAPI._make_request")
+    def test_start_device_auth_failure(self, mock_make_request, api):
         """Test failed device authentication start"""
         mock_make_request.return_value = {}
 
-        result = self.api.start_device_auth()
+        result = api.start_device_auth()
 
         assert result is False
         mock_make_request.assert_called_once()
 
-    def test_get_items_params(self):
-        """Test get_items method parameters"""
-        self.api.access_token = "test_token"
+    @patch("lib.api.KinoPubAPI._save_tokens")
+    @patch("lib.api.xbmc.Monitor")
+    def test_wait_for_activation_backoff(self, mock_monitor, mock_save_tokens, api):
+        """Test poll interval grows on pending and slow_down responses"""
+        api.device_code = "test_device_code"
+        api.expires_in = 600
+        api.interval = 5
+
+        pending = Mock(status_code=400)
+        pending.json.return_value = {"error": "authorization_pending"}
+        slow_down = Mock(status_code=400)
+        slow_down.json.return_value = {"error": "slow_down"}
+        denied = Mock(status_code=400)
+        denied.json.return_value = {"error": "access_denied"}
+        wait_for_abort = mock_monitor.return_value.waitForAbort
+        wait_for_abort.return_value = False
+        mock_monitor.return_value.abortRequested.return_value = False
+
+        with patch.object(
+            api.session, "post", side_effect=[pending, slow_down, denied]
+        ):
+            result = api.wait_for_activation()
+
+        assert result is False
+        assert [c.args[0] for c in wait_for_abort.call_args_list] == [6, 11]
+        assert api.device_code is None
+        assert api.device_code_expires_at is None
+        mock_save_tokens.assert_called_once()
+
+    @patch("lib.api.KinoPubAPI._save_tokens")
+    @patch("lib.api.xbmc.Monitor")
+    def test_wait_for_activation_backoff_short_interval(
+        self, mock_monitor, mock_save_tokens, api
+    ):
+        """Test a short poll interval still grows on every pending response"""
+        api.device_code = "test_device_code"
+        api.expires_in = 600
+        api.interval = 2
+
+        pending = Mock(status_code=400)
+        pending.json.return_value = {"error": "authorization_pending"}
+        denied = Mock(status_code=400)
+        denied.json.return_value = {"error": "access_denied"}
+        wait_for_abort = mock_monitor.return_value.waitForAbort
+        wait_for_abort.return_value = False
+        mock_monitor.return_value.abortRequested.return_value = False
+
+        with patch.object(api.session, "post", side_effect=[pending, pending, denied]):
+            api.wait_for_activation()
+
+        assert [c.args[0] for c in wait_for_abort.call_args_list] == [3, 4]
+
+    @patch("lib.api.KinoPubAPI._save_tokens")
+    @patch("lib.api.xbmc.Monitor")
+    def test_wait_for_activation_rejected_status(
+        self, mock_monitor, mock_save_tokens, api
+    ):
+        """Test a code rejected with a non-400 status is not reused"""
+        api.device_code = "test_device_code"
+        api.device_code_expires_at = time.time() + 300
+        api.expires_in = 600
+        mock_monitor.return_value.abortRequested.return_value = False
+
+        with patch.object(api.session, "post", return_value=Mock(status_code=403)):
+            result = api.wait_for_activation()
+
+        assert result is False
+        assert api.device_code is None
+        mock_save_tokens.assert_called_once()
+
+    @patch("lib.api.xbmc.Monitor")
+    def test_wait_for_activation_abort(self, mock_monitor, api):
+        """Test polling stops as soon as Kodi requests an abort"""
+        api.device_code = "test_device_code"
+        api.expires_in = 600
+        mock_monitor.return_value.abortRequested.return_value = False
+        mock_monitor.return_value.waitForAbort.return_value = True
+
+        pending = Mock(status_code=400)
+        pending.json.return_value = {"error": "authorization_pending"}
+
+        with patch.object(api.session, "post", return_value=pending) as mock_post:
+            result = api.wait_for_activation()
+
+        assert result is False
+        assert api.device_code == "test_device_code"
+        mock_post.assert_called_once()
+
+    @patch("lib.api.KinoPubAPI._save_tokens")
+    @patch("lib.api.time.sleep")
+    def test_wait_for_activation_without_kodi(self, mock_sleep, mock_save_tokens, api):
+        """Test polling falls back to plain sleeps outside Kodi"""
+        api.device_code = "test_device_code"
+        api.expires_in = 600
+        api.interval = 5
+
+        pending = Mock(status_code=400)
+        pending.json.return_value = {"error": "authorization_pending"}
+        denied = Mock(status_code=400)
+        denied.json.return_value = {"error": "access_denied"}
+
+        api.IN_KODI = False
+        with patch.object(api.session, "post", side_effect=[pending, denied]):
+            result = api.wait_for_activation()
+
+        assert result is False
+        mock_sleep.assert_called_once_with(6)
+
+    def test_set_auth_header(self, api):
+        """Test access token is kept on the session headers"""
+        api.access_token = "test_token"
+        api._set_auth_header()
+        assert api.session.headers["Authorization"] == "Bearer test_token"
+
+        api.access_token = None
+        api._set_auth_header()
+        assert "Authorization" not in api.session.headers
 
-        with patch.object(self.api, "_make_request") as mock_request:
-            mock_request.return_value = {"items": []}
+    @patch("lib.api.KinoPubAPI.refresh_access_token")
+    def test_make_request_refreshes_expiring_token(self, mock_refresh, api):
+        """Test token close to expiry is refreshed before the request"""
+        api.access_token = "test_token"
+        api.refresh_token = "test_refresh_token"
+        api.access_token_expires_at = time.time() + 10
 
-            self.api.get_items(page=2, perpage=10, type_filter="movie")
+        response = Mock(status_code=200, content=b'{"items": []}')
+
+        with patch.object(api.session, "request", return_value=response):
+            result = api._make_request("GET", "/v1/items")
+
+        assert result == {"items": []}
+        mock_refresh.assert_called_once()
+
+    def test_failed_refresh_is_not_repeated(self, api):
+        """Test a failed refresh does not run again before every request"""
+        api.access_token = "test_token"
+        api.refresh_token = "test_refresh_token"
+        api.access_token_expires_at = time.time() - 10
+
+        failed = Mock(status_code=400, content=b'{"error": "invalid_grant"}')
+        failed.raise_for_status.side_effect = requests.HTTPError()
+        ok = Mock(status_code=200, content=b'{"items": []}')
+
+        with patch.object(
+            api.session, "request", side_effect=[failed, ok, ok]
+        ) as mock_request:
+            api._make_request("GET", "/v1/items")
+            api._make_request("GET", "/v1/items")
+
+        assert api.access_token_expires_at is None
+        assert mock_request.call_count == 3
+
+    @patch("lib.api.KinoPubAPI.refresh_access_token", return_value=True)
+    def test_make_request_retries_after_401(self, mock_refresh, api):
+        """Test request is repeated once after refreshing a rejected token"""
+        api.access_token = "test_token"
+
+        unauthorized = Mock(status_code=401)
+        ok = Mock(status_code=200, content=b'{"items": []}')
+
+        with patch.object(
+            api.session, "request", side_effect=[unauthorized, ok]
+        ) as mock_request:
+            result = api._make_request("GET", "/v1/items")
+
+        assert result == {"items": []}
+        assert mock_request.call_count == 2
+        mock_refresh.assert_called_once()
+
+    def test_make_request_timeout(self, api):
+        """Test every API call is bounded by connect and read timeouts"""
+        response = Mock(status_code=200, content=b"{}")
+
+        with patch.object(
+            api.session, "request", return_value=response
+        ) as mock_request:
+            api._make_request("GET", "/v1/items")
+
+        assert mock_request.call_args[1]["timeout"] == (3.05, 10)
+
+    def test_make_request_reports_errors(self, api):
+        """Test failed requests are passed to the error hook"""
+        error = requests.ConnectionError("offline")
+
+        with patch.object(api.session, "request", side_effect=error):
+            with patch.object(api, "_on_request_error") as mock_hook:
+                assert api._make_request("GET", "/v1/items") == {}
+
+        mock_hook.assert_called_once_with("/v1/items", error)
+
+    @patch("lib.api.KinoPubAPI.refresh_access_token")
+    def test_make_request_unsupported_method(self, mock_refresh, api):
+        """Test unknown HTTP methods are rejected before any request"""
+        api.refresh_token = "test_refresh_token"
+        api.access_token_expires_at = time.time() - 10
+
+        with patch.object(api.session, "request") as mock_request:
+            with pytest.raises(ValueError):
+                api._make_request("DELETE", "/v1/items")
+
+        mock_request.assert_not_called()
+        mock_refresh.assert_not_called()
+
+    def test_make_request_lowercase_method(self, api):
+        """Test HTTP methods are accepted in any case"""
+        response = Mock(status_code=200, content=b"{}")
+
+        with patch.object(
+            api.session, "request", return_value=response
+        ) as mock_request:
+            api._make_request("get", "/v1/items")
+
+        assert mock_request.call_args.args[0] == "GET"
+
+    @pytest.mark.parametrize("content", [b"", b"<html>Bad Gateway</html>"])
+    def test_make_request_non_json_body(self, content, api):
+        """Test empty or non-JSON bodies are returned as an empty dict"""
+        response = Mock(status_code=200, content=content)
+
+        with patch.object(api.session, "request", return_value=response):
+            assert api._make_request("GET", "/v1/items") == {}
+
+    def test_cache_path_resolved_once(self, kodi_mocks, api):
+        """Test profile path lookup does not touch the Kodi addon again"""
+        mock_addon = kodi_mocks["xbmcaddon"].Addon
+        mock_addon.reset_mock()
+
+        api._get_cache_path()
+
+        mock_addon.assert_not_called()
+
+    def test_save_tokens_atomic(self, tmp_path, api):
+        """Test tokens are written without leaving a temporary file"""
+        api.access_token = "test_token"
+
+        with patch.object(api, "_get_cache_path", return_value=str(tmp_path)):
+            api._save_tokens()
+
+        assert [p.name for p in tmp_path.iterdir()] == ["tokens.json"]
+        assert (
+            json.loads((tmp_path / "tokens.json").read_text())["access_token"]
+            == "test_token"
+        )
+
+    def test_write_json_failure_leaves_no_file(self, tmp_path, api):
+        """Test a failed write removes its temporary file"""
+        with patch.object(api, "_get_cache_path", return_value=str(tmp_path)):
+            with pytest.raises(TypeError):
+                api._write_json("cache.json", {"key": object()})
+
+        assert list(tmp_path.iterdir()) == []
+
+    @patch("lib.api.KinoPubAPI._save_cache")
+    def test_get_genres_cached(self, mock_save_cache, api, mock_request):
+        """Test genres are served from cache within the TTL"""
+        mock_request.return_value = {"genres": []}
+
+        first = api.get_genres("movie")
+        second = api.get_genres("movie")
+
+        assert first == second == {"genres": []}
+        mock_request.assert_called_once()
+        mock_save_cache.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "method,args,kwargs,expected",
+        [
+            (
+                "get_items",
+                (),
+                {"page": 2, "perpage": 10, "type_filter": "movie"},
+                {"page": 2, "perpage": 10, "type": "movie"},
+            ),
+            (
+                "search_content",
+                ("test query",),
+                {"page": 3, "perpage": 15},
+                {"q": "test query", "page": 3, "perpage": 15},
+            ),
+        ],
+    )
+    def test_request_params(self, method, args, kwargs, expected, api, mock_request):
+        """Test listing methods pass their arguments as query parameters"""
+        api.access_token = "test_token"
+
+        getattr(api, method)(*args, **kwargs)
+
+        mock_request.assert_called_once()
+        params = mock_request.call_args[1]["params"]
+        assert {key: params[key] for key in expected} == expected
+
+    @patch("lib.api.KinoPubAPI._save_cache")
+    def test_get_items_serves_prefetched_page_once(
+        self, mock_save_cache, api, mock_request
+    ):
+        """Test a prefetched page is returned without a second request"""
+        page = {"items": [{"id": 1}], "pagination": {"total": 2}}
+        mock_request.return_value = page
+
+        api.prefetch_items(page=2, type_filter="movie")
+        first = api.get_items(page=2, type_filter="movie")
+        second = api.get_items(page=2, type_filter="movie")
+
+        assert first == second == page
+        assert mock_request.call_count == 2
+
+    def test_prefetch_items_fails_fast(self, api):
+        """Test prefetches use a short timeout and a session without retries"""
+        response = Mock(status_code=200, content=b"{}")
+        session = api._get_prefetch_session()
+
+        with patch.object(session, "request", return_value=response) as mock_request:
+            api.prefetch_items(page=2, type_filter="movie")
+
+        assert mock_request.call_args[1]["timeout"] == (3.05, 3)
+        assert session.get_adapter(api.base_url).max_retries.total == 0
+        assert session.headers is api.session.headers
+
+    @patch("lib.api.KinoPubAPI._write_json")
+    def test_save_cache_drops_expired_prefetches(self, mock_write_json, api):
+        """Test prefetched pages never opened are not kept in cache.json"""
+        stale = time.time() - 3600
+        api._cache = {
+            "/v1/items?page=2": (stale, {"items": []}),
+            "/v1/items?page=3": (time.time(), {"items": []}),
+            "/v1/genres": (stale, {"genres": []}),
+        }
 
-            mock_request.assert_called_once()
-            call_args = mock_request.call_args
-            assert call_args[1]["params"]["page"] == 2
-            assert call_args[1]["params"]["perpage"] == 10
-            assert call_args[1]["params"]["type"] == "movie"
+        api._save_cache()
 
-    def test_search_content_params(self):
-        """Test search_content method parameters"""
-        self.api.access_token = "test_token"
+        saved = mock_write_json.call_args.args[1]
+        assert sorted(saved) == ["/v1/genres", "/v1/items?page=3"]
 
-        with patch.object(self.api, "_make_request") as mock_request:
-            mock_request.return_value = {"items": []}
+    def test_iter_items_fetches_pages_lazily(self, api):
+        """Test further pages are only requested when consumed"""
+        pages = [
+            {"items": [{"id": 1}, {"id": 2}], "pagination": {"total": 3}},
+            {"items": [{"id": 3}, {"id": 4}], "pagination": {"total": 3}},
+        ]
 
-            self.api.search_content("test query", page=3, perpage=15)
+        with patch.object(api, "get_items", side_effect=pages) as mock_get:
+            items = list(itertools.islice(api.iter_items(perpage=2), 3))
 
-            mock_request.assert_called_once()
-            call_args = mock_request.call_args
-            assert call_args[1]["params"]["q"] == "test query"
-            assert call_args[1]["params"]["page"] == 3
-            assert call_args[1]["params"]["perpage"] == 15
+        assert [item["id"] for item in items] == [1, 2, 3]
+        assert mock_get.call_count == 2
+        assert mock_get.call_args[1]["page"] == 2
 
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Kino.pub router
+==============================
+
+Tests for the KinoPubRouter directory listings.
+"""
+
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+
+from lib.api import KinoPubAPI
+from lib.router import LIST_PAGE_SIZE, KinoPubRouter
+
+
+class TestKinoPubRouter:
+    """Test cases for KinoPubRouter class"""
+
+    @pytest.fixture
+    def router(self):
+        """Router for a plugin call on handle 1 with a mocked API client"""
+        argv = ["plugin://plugin.video.kinopub/movies", "1", ""]
+        with patch.object(sys, "argv", argv), patch("lib.router.KinoPubAPI"):
+            return KinoPubRouter()
+
+    def test_components_share_addon(self, router):
+        """Test one Addon handle serves the components and their strings"""
+        assert router.ui.addon is router.settings.addon is router.addon
+        assert router.ui.strings.addon is router.addon
+        assert router.settings.strings.addon is router.addon
+
+    def test_content_actions_use_plugin_urls(self, router):
+        """Test content item context actions run absolute plugin:// URLs"""
+        list_item = router.ui.create_content_item({"id": 42, "type": "movie"})
+
+        assert [action for _, action in list_item.context_menu] == [
+            "RunPlugin(plugin://plugin.video.kinopub/watchlist/add/42)",
+            "RunPlugin(plugin://plugin.video.kinopub/details/42)",
+            "RunPlugin(plugin://plugin.video.kinopub/play/quality/42)",
+        ]
+
+    @patch("lib.router.xbmcplugin")
+    def test_entries_use_plugin_urls(self, mock_xbmcplugin, router):
+        """Test directory entries carry absolute plugin:// URLs"""
+        router.api.get_genres.return_value = {"genres": [{"id": 7, "title": "Drama"}]}
+
+        router.genres()
+
+        entries = mock_xbmcplugin.addDirectoryItems.call_args.args[1]
+        assert [url for url, _, _ in entries] == [
+            "plugin://plugin.video.kinopub/genre/7"
+        ]
+
+    @patch("lib.router.xbmcplugin")
+    def test_next_movies_page_is_prefetched(self, mock_xbmcplugin, router):
+        """Test the page after a listing is served without another request"""
+        pages = [
+            {"items": [{"id": 1}], "pagination": {"total": 2}},
+            {"items": [{"id": 2}], "pagination": {"total": 2}},
+        ]
+        with patch.object(KinoPubAPI, "IN_KODI", False):
+            router.api = KinoPubAPI()
+        router.api._make_request = Mock(side_effect=pages)
+
+        router.movies()
+        first = mock_xbmcplugin.addDirectoryItems.call_args.args[1]
+        router.movies(page=2)
+        second = mock_xbmcplugin.addDirectoryItems.call_args.args[1]
+
+        assert first[-1][0] == "plugin://plugin.video.kinopub/movies/2"
+        assert [url for url, _, _ in second] == ["plugin://plugin.video.kinopub/play/2"]
+        assert router.api._make_request.call_count == 2
+
+    @patch("lib.router.xbmcplugin")
+    def test_channels_next_page(self, mock_xbmcplugin, router):
+        """Test long channel lists are split into linked pages"""
+        channels = [{"id": i, "title": f"Channel {i}"} for i in range(60)]
+        router.api.get_tv_channels.return_value = {"channels": channels}
+
+        router.channels()
+        first = mock_xbmcplugin.addDirectoryItems.call_args.args[1]
+        router.channels(page=2)
+        second = mock_xbmcplugin.addDirectoryItems.call_args.args[1]
+
+        assert len(first) == LIST_PAGE_SIZE + 1
+        assert first[-1][0] == "plugin://plugin.video.kinopub/channels/2"
+        assert [url for url, _, _ in second] == [
+            f"plugin://plugin.video.kinopub/play/channel/{i}"
+            for i in range(LIST_PAGE_SIZE, 60)
+        ]
+
+    @patch("lib.router.xbmcgui.Dialog")
+    @patch("lib.router.xbmcplugin")
+    def test_failed_listing_closes_directory(
+        self, mock_xbmcplugin, mock_dialog, router
+    ):
+        """Test a listing that fails to load still ends the directory"""
+        router.api.get_tv_channels.return_value = {}
+
+        router.channels()
+
+        mock_dialog.return_value.ok.assert_called_once()
+        mock_xbmcplugin.addDirectoryItems.assert_not_called()
+        mock_xbmcplugin.endOfDirectory.assert_called_once_with(1, succeeded=False)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
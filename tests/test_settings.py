@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Kino.pub settings
+================================
+
+Tests for the KinoPubSettings class functionality.
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from lib.settings import KinoPubSettings
+
+
+class TestKinoPubSettings:
+    """Test cases for KinoPubSettings class"""
+
+    @pytest.fixture
+    def addon(self):
+        """Addon handle storing settings as strings, like Kodi does"""
+        stored = {}
+        addon = Mock()
+        addon.getSetting.side_effect = lambda setting_id: stored.get(setting_id, "")
+        addon.setSetting.side_effect = stored.__setitem__
+        addon.stored = stored
+        return addon
+
+    @pytest.fixture
+    def settings(self, addon):
+        """Settings backed by the fixture addon"""
+        return KinoPubSettings(addon=addon)
+
+    @pytest.mark.parametrize(
+        "type_name,value,stored,parsed",
+        [
+            ("boolean", True, "true", True),
+            ("boolean", 1, "true", True),
+            ("boolean", 0, "false", False),
+            ("int", 30, "30", 30),
+            ("int", True, "1", 1),
+            ("float", 2, "2.0", 2.0),
+        ],
+    )
+    def test_typed_setting_round_trip(
+        self, type_name, value, stored, parsed, addon, settings
+    ):
+        """Test typed setters format by setter type and getters parse it back"""
+        getattr(settings, f"set_{type_name}_setting")("setting", value)
+
+        assert addon.stored["setting"] == stored
+        assert getattr(settings, f"get_{type_name}_setting")("setting") == parsed
+
+    def test_set_parental_controls_none(self, addon, settings):
+        """Test a falsy non-bool value is stored as false"""
+        settings.set_parental_controls(None)
+
+        assert addon.stored["parental_controls"] == "false"
+        assert settings.get_parental_controls() is False
+
+    def test_typed_getter_defaults(self, addon, settings):
+        """Test unset or malformed values fall back to the default"""
+        addon.stored["cache_duration"] = "soon"
+
+        assert settings.get_cache_duration() == 3600
+        assert settings.get_int_setting("missing", 5) == 5
+        assert settings.get_video_quality() == "auto"
+
+    def test_get_setting_cached(self, addon, settings):
+        """Test a setting is read from Kodi once and kept after writes"""
+        addon.stored["video_quality"] = "720p"
+
+        assert settings.get_video_quality() == "720p"
+        settings.set_video_quality("1080p")
+
+        assert settings.get_video_quality() == "1080p"
+        addon.getSetting.assert_called_once_with("video_quality")
+
+    def test_open_settings_clears_cache(self, addon, settings):
+        """Test values changed in the settings dialog are read again"""
+        settings.get_video_quality()
+        addon.stored["video_quality"] = "4k"
+
+        settings.open_settings()
+
+        assert settings.get_video_quality() == "4k"
+        assert addon.getSetting.call_count == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])